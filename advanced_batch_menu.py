@@ -4,9 +4,12 @@ from PIL import Image, ImageEnhance, ImageOps, ImageFilter
 import numpy as np
 import os
 from datetime import datetime
-import cv2
 import json
 
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
 class AdvancedBatchMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -730,7 +733,7 @@ class AdvancedBatchMenu:
 
         for i, (variation_type, variation_value) in enumerate(variations):
             try:
-                print(f"DEBUG: Processing {variation_type} - {variation_value}")  # DEBUG
+                logger.debug("Processing %s - %s", variation_type, variation_value)  # DEBUG
                 img = Image.open(original_path)
                 processed_img = self.apply_advanced_variation(img, variation_type, variation_value)
                 filename = self.generate_advanced_filename(original_name, variation_type, variation_value, i)
@@ -1128,7 +1131,7 @@ class AdvancedBatchMenu:
             filename = os.path.basename(file_path)
             self.show_info(f"Image '{filename}' loaded and selected for advanced batch processing")
         else:
-            print("DEBUG: No file selected in load_image_directly")
+            logger.debug("No file selected in load_image_directly")
     
     def show_info(self, message):
         """Show info message"""
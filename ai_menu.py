@@ -9,6 +9,10 @@ import os
 import datetime
 from io import BytesIO
 
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
 class AIMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -108,7 +112,7 @@ class AIMenu:
         endpoint_label.pack(side="left", padx=5)
         
         self.service_var = tk.StringVar(value="local")
-        print(f"DEBUG: Setting default service to: {self.service_var.get()}")
+        logger.debug("Setting default service to: %s", self.service_var.get())
         service_combo = ctk.CTkComboBox(
             endpoint_frame, 
             values=["local", "stablehorde", "huggingface", "falai", "openai", "stability", "custom"],
@@ -675,25 +679,25 @@ class AIMenu:
         self.progress_bar.set(0.3)
         
         try:
-            print(f"DEBUG: Hugging Face request URL: {url}")
-            print(f"DEBUG: Hugging Face request headers: {headers}")
-            print(f"DEBUG: Hugging Face request data: {data}")
+            logger.debug("Hugging Face request URL: %s", url)
+            logger.debug("Hugging Face request headers: %s", headers)
+            logger.debug("Hugging Face request data: %s", data)
             
             response = requests.post(url, headers=headers, json=data)
-            print(f"DEBUG: Hugging Face response status: {response.status_code}")
-            print(f"DEBUG: Hugging Face response headers: {dict(response.headers)}")
+            logger.debug("Hugging Face response status: %s", response.status_code)
+            logger.debug("Hugging Face response headers: %s", dict(response.headers))
             
             if response.status_code == 200:
                 # Hugging Face returns image data directly
                 image_data = response.content
-                print(f"DEBUG: Downloaded image data size: {len(image_data)} bytes")
+                logger.debug("Downloaded image data size: %s bytes", len(image_data))
                 
                 if len(image_data) > 1000:  # Valid image should be larger
                     # Save image to file
                     ai_folder = os.path.join(os.getcwd(), "ai_generated_images")
                     if not os.path.exists(ai_folder):
                         os.makedirs(ai_folder)
-                        print(f"DEBUG: Created AI images folder: {ai_folder}")
+                        logger.debug("Created AI images folder: %s", ai_folder)
                     
                     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
                     filename = f"ai_generated_{timestamp}_1.png"
@@ -701,7 +705,7 @@ class AIMenu:
                     
                     with open(filepath, 'wb') as f:
                         f.write(image_data)
-                    print(f"DEBUG: Image saved to: {filepath}")
+                    logger.debug("Image saved to: %s", filepath)
                     
                     # Process the image
                     self.process_image_data(image_data, f"Hugging Face - {prompt[:30]}...")
@@ -724,7 +728,7 @@ class AIMenu:
                 self.editor.update_status(f"Hugging Face error: {response.status_code} - {response.text}")
                 
         except Exception as e:
-            print(f"DEBUG: Hugging Face error: {e}")
+            logger.warning("Hugging Face error: %s", e)
             import traceback
             traceback.print_exc()
             self.status_label.configure(text=f"Hugging Face error: {str(e)}")
@@ -769,17 +773,17 @@ class AIMenu:
         self.progress_bar.set(0.3)
         
         try:
-            print(f"DEBUG: Fal.ai request URL: {url}")
-            print(f"DEBUG: Fal.ai request headers: {headers}")
-            print(f"DEBUG: Fal.ai request data: {data}")
+            logger.debug("Fal.ai request URL: %s", url)
+            logger.debug("Fal.ai request headers: %s", headers)
+            logger.debug("Fal.ai request data: %s", data)
             
             response = requests.post(url, headers=headers, json=data)
-            print(f"DEBUG: Fal.ai response status: {response.status_code}")
-            print(f"DEBUG: Fal.ai response text: {response.text}")
+            logger.debug("Fal.ai response status: %s", response.status_code)
+            logger.debug("Fal.ai response text: %s", response.text)
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"DEBUG: Fal.ai full response: {result}")
+                logger.debug("Fal.ai full response: %s", result)
                 
                 if "images" in result and result["images"]:
                     self.progress_bar.set(0.8)
@@ -787,19 +791,19 @@ class AIMenu:
                     
                     # Process the first image
                     image_url = result["images"][0]["url"]
-                    print(f"DEBUG: Fal.ai image URL: {image_url}")
+                    logger.debug("Fal.ai image URL: %s", image_url)
                     
                     # Download the image
                     img_response = requests.get(image_url)
                     if img_response.status_code == 200:
                         image_data = img_response.content
-                        print(f"DEBUG: Downloaded image data size: {len(image_data)} bytes")
+                        logger.debug("Downloaded image data size: %s bytes", len(image_data))
                         
                         # Save image to file
                         ai_folder = os.path.join(os.getcwd(), "ai_generated_images")
                         if not os.path.exists(ai_folder):
                             os.makedirs(ai_folder)
-                            print(f"DEBUG: Created AI images folder: {ai_folder}")
+                            logger.debug("Created AI images folder: %s", ai_folder)
                         
                         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
                         filename = f"ai_generated_{timestamp}_1.png"
@@ -807,7 +811,7 @@ class AIMenu:
                         
                         with open(filepath, 'wb') as f:
                             f.write(image_data)
-                        print(f"DEBUG: Image saved to: {filepath}")
+                        logger.debug("Image saved to: %s", filepath)
                         
                         # Process the image
                         self.process_image_data(image_data, f"Fal.ai - {prompt[:30]}...")
@@ -829,7 +833,7 @@ class AIMenu:
                 self.editor.update_status(f"Fal.ai error: {response.status_code} - {response.text}")
                 
         except Exception as e:
-            print(f"DEBUG: Fal.ai error: {e}")
+            logger.warning("Fal.ai error: %s", e)
             import traceback
             traceback.print_exc()
             self.status_label.configure(text=f"Fal.ai error: {str(e)}")
@@ -879,15 +883,15 @@ class AIMenu:
         
         try:
             # Log the request for debugging
-            print(f"DEBUG: Stable Horde request URL: {url}")
-            print(f"DEBUG: Stable Horde request headers: {headers}")
-            print(f"DEBUG: Stable Horde request data: {data}")
+            logger.debug("Stable Horde request URL: %s", url)
+            logger.debug("Stable Horde request headers: %s", headers)
+            logger.debug("Stable Horde request data: %s", data)
             
             # Submit generation request
             response = requests.post(url, headers=headers, json=data)
             
-            print(f"DEBUG: Stable Horde response status: {response.status_code}")
-            print(f"DEBUG: Stable Horde response text: {response.text}")
+            logger.debug("Stable Horde response status: %s", response.status_code)
+            logger.debug("Stable Horde response text: %s", response.text)
             
             if response.status_code == 202:
                 result = response.json()
@@ -910,13 +914,13 @@ class AIMenu:
                         error_data = response.json()
                         error_msg += f" - {error_data.get('message', 'Unknown error')}"
                         # Log the full error for debugging
-                        print(f"DEBUG: Stable Horde error details: {error_data}")
+                        logger.warning("Stable Horde error details: %s", error_data)
                     except:
                         error_msg += f" - {response.text}"
-                        print(f"DEBUG: Stable Horde raw error: {response.text}")
+                        logger.warning("Stable Horde raw error: %s", response.text)
                 
                 # Log the request data for debugging
-                print(f"DEBUG: Stable Horde request data: {data}")
+                logger.debug("Stable Horde request data: %s", data)
                         
                 self.status_label.configure(text=error_msg)
                 self.progress_bar.set(0)
@@ -1169,7 +1173,7 @@ class AIMenu:
     def process_image_data(self, image_data, prompt):
         """Process generated image data"""
         try:
-            print(f"DEBUG: Processing image data, size: {len(image_data)} bytes")
+            logger.debug("Processing image data, size: %s bytes", len(image_data))
             
             # Try different approaches to load the image
             image = None
@@ -1177,40 +1181,40 @@ class AIMenu:
             # Method 1: Direct PIL load
             try:
                 image = Image.open(io.BytesIO(image_data))
-                print(f"DEBUG: Method 1 - PIL direct load successful: {image.size}, mode: {image.mode}")
+                logger.debug("Method 1 - PIL direct load successful: %s, mode: %s", image.size, image.mode)
             except Exception as e1:
-                print(f"DEBUG: Method 1 failed: {e1}")
+                logger.debug("Method 1 failed: %s", e1)
                 
                 # Method 2: Try to detect format manually
                 try:
                     # Check if it's a valid image by looking at the header
                     if image_data.startswith(b'\x89PNG'):
-                        print("DEBUG: Detected PNG format")
+                        logger.debug("Detected PNG format")
                     elif image_data.startswith(b'\xff\xd8\xff'):
-                        print("DEBUG: Detected JPEG format")
+                        logger.debug("Detected JPEG format")
                     elif image_data.startswith(b'RIFF') and b'WEBP' in image_data[:20]:
-                        print("DEBUG: Detected WEBP format")
+                        logger.debug("Detected WEBP format")
                     
                     # Try loading with different formats
                     for fmt in ['PNG', 'JPEG', 'WEBP', 'BMP']:
                         try:
                             image = Image.open(io.BytesIO(image_data), formats=[fmt])
-                            print(f"DEBUG: Method 2 - Loaded as {fmt}: {image.size}, mode: {image.mode}")
+                            logger.debug("Method 2 - Loaded as %s: %s, mode: %s", fmt, image.size, image.mode)
                             break
                         except:
                             continue
                             
                 except Exception as e2:
-                    print(f"DEBUG: Method 2 failed: {e2}")
+                    logger.debug("Method 2 failed: %s", e2)
                     
                     # Method 3: Try to fix the data
                     try:
                         # Sometimes the data needs to be cleaned
                         cleaned_data = image_data.strip()
                         image = Image.open(io.BytesIO(cleaned_data))
-                        print(f"DEBUG: Method 3 - Cleaned data load successful: {image.size}, mode: {image.mode}")
+                        logger.debug("Method 3 - Cleaned data load successful: %s, mode: %s", image.size, image.mode)
                     except Exception as e3:
-                        print(f"DEBUG: Method 3 failed: {e3}")
+                        logger.debug("Method 3 failed: %s", e3)
                         raise e3
             
             if image is None:
@@ -1219,7 +1223,7 @@ class AIMenu:
             # Convert to RGB if necessary
             if image.mode != 'RGB':
                 image = image.convert('RGB')
-                print(f"DEBUG: Converted image to RGB mode")
+                logger.debug("Converted image to RGB mode")
             
             # Add to history
             history_item = {
@@ -1233,10 +1237,10 @@ class AIMenu:
             
             # Auto-load to canvas (load the last generated image)
             self.load_latest_image_to_canvas()
-            print(f"DEBUG: Image added to history and loaded to canvas")
+            logger.debug("Image added to history and loaded to canvas")
                 
         except Exception as e:
-            print(f"DEBUG: Error processing image: {e}")
+            logger.warning("Error processing image: %s", e)
             import traceback
             traceback.print_exc()
             self.editor.update_status(f"Error processing generated image: {str(e)}")
@@ -1268,21 +1272,14 @@ class AIMenu:
             # Get the latest image (last in history)
             history_item = self.generation_history[-1]
             
-            # Save image temporarily
-            temp_path = f"temp_ai_generated_latest.png"
-            history_item['image'].save(temp_path)
-            
-            # Add to editor
-            self.editor.add_image(temp_path)
-            
-            # Remove temporary file
-            os.remove(temp_path)
+            # Add to editor, the generated pixels stay in memory as the layer's source
+            self.editor.add_image("ai_generated_latest.png", self.editor.image_proxy(history_item['image']))
             
             self.editor.update_status(f"Loaded AI-generated image: {history_item['prompt'][:30]}...")
-            print(f"DEBUG: Latest image loaded to canvas successfully")
+            logger.debug("Latest image loaded to canvas successfully")
             
         except Exception as e:
-            print(f"DEBUG: Error loading latest image to canvas: {e}")
+            logger.warning("Error loading latest image to canvas: %s", e)
             self.editor.update_status(f"Error loading image to canvas: {str(e)}")
     
     def load_to_canvas(self):
@@ -1295,15 +1292,8 @@ class AIMenu:
         history_item = self.generation_history[index]
         
         try:
-            # Save image temporarily
-            temp_path = f"temp_ai_generated_{index}.png"
-            history_item['image'].save(temp_path)
-            
-            # Add to editor
-            self.editor.add_image(temp_path)
-            
-            # Remove temporary file
-            os.remove(temp_path)
+            # Add to editor, the generated pixels stay in memory as the layer's source
+            self.editor.add_image(f"ai_generated_{index}.png", self.editor.image_proxy(history_item['image']))
             
             self.editor.update_status(f"Loaded AI-generated image: {history_item['prompt'][:30]}...")
             
@@ -0,0 +1,163 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_workers():
+    """Number of worker threads for CPU heavy Pillow work (decoding releases the GIL)"""
+    return min(8, os.cpu_count() or 1)
+
+
+class BackgroundBatch:
+    def __init__(self, root, func, items, on_progress=None, on_done=None, max_workers=None, poll_ms=50):
+        """Run func(item) for every item in a thread pool, reporting back on the Tk thread"""
+        self.root = root
+        self.func = func
+        self.items = list(items)
+        self.on_progress = on_progress  # on_progress(completed, total)
+        self.on_done = on_done  # on_done(results, errors, cancelled), results follow item order
+        self.max_workers = max_workers or default_workers()
+        self.poll_ms = poll_ms
+        self.executor = None
+        self.futures = []
+        self.cancelled = False
+        self.finished = False
+        
+    def start(self):
+        """Submit all items and start polling for completion"""
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.futures = [self.executor.submit(self.func, item) for item in self.items]
+        self.root.after(self.poll_ms, self.poll)
+        return self
+        
+    def cancel(self):
+        """Drop items that have not started yet, on_done is still called once running ones finish"""
+        self.cancelled = True
+        for future in self.futures:
+            future.cancel()
+            
+    def poll(self):
+        """Report progress from the Tk thread and finish when every item is done"""
+        if self.finished:
+            return
+        completed = sum(1 for future in self.futures if future.done())
+        if self.on_progress:
+            self.on_progress(completed, len(self.futures))
+        if completed < len(self.futures):
+            self.root.after(self.poll_ms, self.poll)
+            return
+        
+        self.finished = True
+        self.executor.shutdown(wait=False)
+        results = []
+        errors = []
+        for item, future in zip(self.items, self.futures):
+            if future.cancelled():
+                results.append(None)
+            elif future.exception() is not None:
+                results.append(None)
+                errors.append((item, future.exception()))
+            else:
+                results.append(future.result())
+        if self.on_done:
+            self.on_done(results, errors, self.cancelled)
+
+
+class LatestOnlyWorker:
+    def __init__(self, root, func, on_result, on_error=None, poll_ms=20, idle_seconds=10.0):
+        """Run func(request) on one worker thread, always for the newest submitted request only
+        
+        Requests submitted while func is busy replace each other, the worker then
+        continues with the newest one. The result of a computation that finishes
+        is still shown so continuous input gets intermediate updates, unless
+        cancel() was called. on_result(request, result) and
+        on_error(request, exception) are called on the Tk thread.
+        """
+        self.root = root
+        self.func = func
+        self.on_result = on_result
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.idle_seconds = idle_seconds  # The thread exits after this long without work
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pending = None  # (generation, request) waiting for the worker
+        self.finished = None  # (generation, request, result, exception) waiting for the Tk thread
+        self.running = False  # The worker is inside func
+        self.generation = 0  # Number of the newest submitted request
+        self.cancelled_generation = 0  # Results of requests up to this number are dropped
+        self.polling = False
+        self.closed = False
+        self.dropped = 0  # Requests replaced before the worker got to them
+        
+    def submit(self, request):
+        """Queue request, replacing any request the worker has not started yet"""
+        with self.lock:
+            self.generation += 1
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = (self.generation, request)
+            thread = None
+            if self.thread is None:
+                thread = self.thread = threading.Thread(target=self.run, daemon=True)
+        if thread is not None:
+            thread.start()
+        self.wakeup.set()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self.poll)
+            
+    def cancel(self):
+        """Forget the queued request and ignore the result of the running one"""
+        with self.lock:
+            self.cancelled_generation = self.generation
+            self.pending = None
+            self.finished = None
+            
+    def close(self):
+        """Cancel everything and let the worker thread exit"""
+        self.cancel()
+        self.closed = True
+        self.wakeup.set()
+        
+    def run(self):
+        """Worker thread: compute the newest request and hand its result to poll()"""
+        while True:
+            self.wakeup.wait(self.idle_seconds)
+            self.wakeup.clear()
+            with self.lock:
+                job, self.pending = self.pending, None
+                self.running = job is not None
+                if job is None or self.closed:
+                    # Idle or closed, submit() starts a new thread when needed
+                    self.thread = None
+                    self.running = False
+                    return
+            generation, request = job
+            result = exception = None
+            try:
+                result = self.func(request)
+            except Exception as e:
+                exception = e
+            with self.lock:
+                self.running = False
+                if generation > self.cancelled_generation:
+                    self.finished = (generation, request, result, exception)
+                    
+    def poll(self):
+        """Deliver a finished result from the Tk thread, polling while work is outstanding"""
+        with self.lock:
+            finished, self.finished = self.finished, None
+            busy = self.pending is not None or self.running
+        if finished is not None:
+            generation, request, result, exception = finished
+            if exception is None:
+                self.on_result(request, result)
+            elif self.on_error:
+                self.on_error(request, exception)
+        if busy and not self.closed:
+            self.root.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+
@@ -6,6 +6,10 @@ import os
 from datetime import datetime
 from PIL import ImageTk
 
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
 class BatchMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -777,7 +781,7 @@ class BatchMenu:
             filename = os.path.basename(file_path)
             self.show_info(f"Image '{filename}' loaded and selected for batch processing")
         else:
-            print("DEBUG: No file selected in load_image_directly")
+            logger.debug("No file selected in load_image_directly")
     
     def open_output_folder(self, folder_path):
         """Open the output folder in file explorer"""
@@ -815,5 +819,5 @@ class BatchMenu:
         # Zaznacz w głównym edytorze
         self.editor.selected_image_index = idx
         self.editor.selected_image = self.editor.images[idx]
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_image_info()
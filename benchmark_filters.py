@@ -0,0 +1,65 @@
+"""Compare the fused LUT adjust_rgb with the original ImageEnhance + numpy pipeline
+
+Run: python benchmark_filters.py [width height repeats]
+"""
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from filters_menu import adjust_rgb
+
+
+def adjust_rgb_reference(img, brightness_factor, contrast_factor, red_factor, green_factor, blue_factor):
+    """The previous implementation: brightness, contrast and three channel passes"""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if brightness_factor != 1.0:
+        img = ImageEnhance.Brightness(img).enhance(brightness_factor)
+    if contrast_factor != 1.0:
+        img = ImageEnhance.Contrast(img).enhance(contrast_factor)
+    if red_factor != 1.0 or green_factor != 1.0 or blue_factor != 1.0:
+        img_array = np.array(img)
+        img_array[:, :, 0] = np.clip(img_array[:, :, 0] * red_factor, 0, 255)
+        img_array[:, :, 1] = np.clip(img_array[:, :, 1] * green_factor, 0, 255)
+        img_array[:, :, 2] = np.clip(img_array[:, :, 2] * blue_factor, 0, 255)
+        img = Image.fromarray(img_array.astype(np.uint8))
+    return img
+
+
+# (brightness, contrast, red, green, blue) slider settings
+SETTINGS = [
+    (1.0, 1.0, 1.3, 1.0, 0.7),
+    (1.4, 1.0, 1.0, 1.0, 1.0),
+    (1.0, 0.6, 1.0, 1.0, 1.0),
+    (0.8, 1.7, 1.2, 0.9, 1.5),
+    (1.9, 0.3, 0.5, 2.0, 1.1),
+]
+
+
+def best_time(func, repeats):
+    """Return the fastest of repeats runs in milliseconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(width=3000, height=2000, repeats=5):
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    print(f"RGB adjustments on a {width}x{height} image, best of {repeats}")
+
+    for factors in SETTINGS:
+        identical = adjust_rgb(img, *factors).tobytes() == adjust_rgb_reference(img, *factors).tobytes()
+        reference_ms = best_time(lambda: adjust_rgb_reference(img, *factors), repeats)
+        fused_ms = best_time(lambda: adjust_rgb(img, *factors), repeats)
+        print(f"  {factors}: reference {reference_ms:7.1f} ms, fused LUT {fused_ms:7.1f} ms "
+              f"({reference_ms / fused_ms:4.1f}x), identical: {identical}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
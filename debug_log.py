@@ -0,0 +1,98 @@
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Levels come from the environment at startup, for example
+#   GRAPHICS_EDITOR_LOG=debug                      everything
+#   GRAPHICS_EDITOR_LOG=info,main=debug            main.py in detail, the rest quieter
+#   GRAPHICS_EDITOR_LOG=timing=debug               hot-path timings of every module
+#   GRAPHICS_EDITOR_LOG=timing.main=debug          timings of main.py only
+# Without it only warnings are shown. Messages use lazy %-formatting, so a
+# disabled call costs one cached level check.
+LOG_ENV = "GRAPHICS_EDITOR_LOG"
+ROOT_LOGGER = "editor"
+DEFAULT_LEVEL = logging.WARNING
+
+NO_TIMING = nullcontext()
+
+
+def module_name(name):
+    """Return the logger name of a module (the script itself runs as __main__)"""
+    return "main" if name == "__main__" else name
+
+
+def get_logger(name):
+    """Return the logger of a module, call as get_logger(__name__)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{module_name(name)}")
+
+
+def get_timer(name):
+    """Return a timing function for a module, call as get_timer(__name__)
+
+    with timed("label"): ... logs how long the block took when the module's
+    timing logger is enabled, and is a shared no-op context otherwise.
+    """
+    logger = logging.getLogger(f"{ROOT_LOGGER}.timing.{module_name(name)}")
+
+    def timed(label):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return NO_TIMING
+        return measure(logger, label)
+    return timed
+
+
+@contextmanager
+def measure(logger, label):
+    """Log the wall time of the block in milliseconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.debug("%s took %.2f ms", label, (time.perf_counter() - start) * 1000)
+
+
+def parse_levels(spec):
+    """Parse "level,module=level,..." into (default level, {module: level})"""
+    default = DEFAULT_LEVEL
+    levels = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, level = part.rpartition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if not isinstance(level, int):
+            continue  # Unknown level name, ignore the entry
+        if name:
+            levels[name.strip()] = level
+        else:
+            default = level
+    return default, levels
+
+
+def configure(spec=None):
+    """Set up the editor loggers from a level spec (default: the GRAPHICS_EDITOR_LOG variable)"""
+    if spec is None:
+        spec = os.environ.get(LOG_ENV, "")
+    default, levels = parse_levels(spec)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(default)
+    root.propagate = False
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(levelname)s: %(name)s: %(message)s"))
+        root.addHandler(handler)
+
+    # Timings are opt-in even when everything else is at debug level
+    timing = logging.getLogger(f"{ROOT_LOGGER}.timing")
+    timing.setLevel(levels.pop("timing", logging.WARNING))
+
+    for name, level in levels.items():
+        logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level)
+
+
+configure()
@@ -3,6 +3,10 @@ import tkinter as tk
 from PIL import Image, ImageDraw
 import math
 
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
 class DrawMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -332,15 +336,15 @@ class DrawMenu:
     # COLOR FUNCTIONS
     def set_line_color(self, color):
         """Set line color directly"""
-        print(f"DEBUG: set_line_color called with {color}!")
+        logger.debug("set_line_color called with %s!", color)
         self.line_color = color
         self.current_color_display.configure(bg=color)
         self.editor.update_status(f"✅ Line color set to {color}")
-        print(f"DEBUG: Line color set to: {self.line_color}")
+        logger.debug("Line color set to: %s", self.line_color)
         
     def set_line_style(self, style):
         """Set line style (solid, dashed, dotted, dashdot)"""
-        print(f"DEBUG: set_line_style called with {style}!")
+        logger.debug("set_line_style called with %s!", style)
         self.line_style = style
         
         # Update button colors
@@ -360,7 +364,7 @@ class DrawMenu:
             self.dashdot_btn.configure(fg_color="green")
             
         self.editor.update_status(f"✅ Line style set to {style}")
-        print(f"DEBUG: Line style set to: {self.line_style}")
+        logger.debug("Line style set to: %s", self.line_style)
         
     def get_dash_pattern(self):
         """Get dash pattern for current line style"""
@@ -390,7 +394,7 @@ class DrawMenu:
         
     def open_professional_color_picker(self):
         """Open professional color picker with RGB sliders"""
-        print("DEBUG: Opening professional color picker!")
+        logger.debug("Opening professional color picker!")
         
         # Create color picker window
         self.color_picker_window = ctk.CTkToplevel(self.editor.root)
@@ -572,7 +576,7 @@ class DrawMenu:
             self.line_color = hex_color
             self.current_color_display.configure(bg=hex_color)
             self.editor.update_status(f"✅ Line color set to {hex_color}")
-            print(f"DEBUG: Color applied: {hex_color}")
+            logger.debug("Color applied: %s", hex_color)
             self.color_picker_window.destroy()
         else:
             self.editor.update_status("❌ Invalid hex color format")
@@ -674,16 +678,16 @@ class DrawMenu:
         if self.is_drawing_active or self.is_drawing_shapes:
             # Always start fresh with new point
             self.drawing_points = [(x, y)]
-            print(f"DEBUG: Started drawing at ({x}, {y}) for {self.current_shape}")
+            logger.debug("Started drawing at (%s, %s) for %s", x, y, self.current_shape)
         else:
-            print(f"DEBUG: Drawing mode not active")
+            logger.debug("Drawing mode not active")
             
     def continue_drawing(self, x, y):
         """Continue drawing to the given position"""
         if not self.is_drawing_mode_active:
             return
             
-        print(f"DEBUG: continue_drawing called - is_drawing_active={self.is_drawing_active}, is_drawing_shapes={self.is_drawing_shapes}, current_shape={self.current_shape}, points={len(self.drawing_points)}")
+        logger.debug("continue_drawing called - is_drawing_active=%s, is_drawing_shapes=%s, current_shape=%s, points=%s", self.is_drawing_active, self.is_drawing_shapes, self.current_shape, len(self.drawing_points))
             
         if (self.is_drawing_active or self.is_drawing_shapes):
             if self.current_shape == "freehand":
@@ -691,22 +695,23 @@ class DrawMenu:
                 if len(self.drawing_points) == 0:
                     # Start new freehand drawing
                     self.drawing_points = [(x, y)]
-                    print("DEBUG: Starting new freehand drawing")
+                    logger.debug("Starting new freehand drawing")
                 else:
                     # Continue existing freehand drawing
                     self.drawing_points.append((x, y))
-                    print(f"DEBUG: Drawing freehand - added point ({x}, {y}), total points: {len(self.drawing_points)}")
+                    logger.debug("Drawing freehand - added point (%s, %s), total points: %s", x, y, len(self.drawing_points))
                     # Draw line from previous point to current point
                     if len(self.drawing_points) >= 2:
                         prev_x, prev_y = self.drawing_points[-2]
                         dash_pattern = self.get_dash_pattern()
-                        self.editor.canvas.create_line(
+                        line_id = self.editor.canvas.create_line(
                             prev_x, prev_y, x, y,
                             fill=self.line_color,
                             width=self.line_width,
                             dash=dash_pattern,
                             tags="drawing"
                         )
+                        self.editor.place_overlay(line_id)
                         
                         # Store freehand element after each line segment
                         element = {
@@ -732,13 +737,14 @@ class DrawMenu:
                 x1, y1 = self.drawing_points[i]
                 x2, y2 = self.drawing_points[i + 1]
                 
-                self.editor.canvas.create_line(
+                line_id = self.editor.canvas.create_line(
                     x1, y1, x2, y2,
                     fill=self.line_color,
                     width=self.line_width,
                     dash=dash_pattern,
                     tags="drawing"
                 )
+                self.editor.place_overlay(line_id)
                 
             # Store as freehand element
             element = {
@@ -787,8 +793,9 @@ class DrawMenu:
                     dash=dash_pattern,
                     tags="drawing"
                 )
+        self.editor.place_overlay("drawing")
         
-        print(f"DEBUG: Redrew {len(self.drawing_elements)} drawing elements")
+        logger.debug("Redrew %s drawing elements", len(self.drawing_elements))
         
     def clear_all_drawings(self):
         """Clear all drawings from canvas"""
@@ -828,6 +835,7 @@ class DrawMenu:
                         dash=dash_pattern,
                         tags="drawing"
                     )
+            self.editor.place_overlay("drawing")
 
                         
             self.editor.update_status("↩️ Last drawing cleared")
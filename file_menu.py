@@ -4,6 +4,11 @@ from tkinter import filedialog, messagebox
 from PIL import Image
 import os
 
+from image_cache import rotate_layer_image
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
 class FileMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -152,10 +157,20 @@ class FileMenu:
         )
         delete_btn.pack(fill="x", padx=10, pady=2)
         
+        # Show/hide selected image button
+        visibility_btn = ctk.CTkButton(
+            stack_frame, 
+            text="Hide / Show Selected Image", 
+            command=self.toggle_selected_visibility,
+            state="disabled"
+        )
+        visibility_btn.pack(fill="x", padx=10, pady=2)
+        
         # Store button references for enabling/disabling
         self.bring_front_btn = bring_front_btn
         self.bring_back_btn = bring_back_btn
         self.delete_btn = delete_btn
+        self.visibility_btn = visibility_btn
         
         # Image list
         self.create_image_list(stack_frame)
@@ -239,7 +254,7 @@ class FileMenu:
         
     def load_single_image(self):
         """Load a single image file"""
-        print(f"DEBUG: load_single_image called")
+        logger.debug("load_single_image called")
         
         file_path = filedialog.askopenfilename(
             title="Select Image",
@@ -250,18 +265,18 @@ class FileMenu:
         )
         
         if file_path:
-            print(f"DEBUG: Selected file: {file_path}")
-            self.editor.save_state()  # Save state for undo
-            self.editor.add_image(file_path)
+            logger.debug("Selected file: %s", file_path)
+            with self.editor.transaction("Load image"):
+                self.editor.add_image(file_path)
             self.update_image_list()
             self.update_buttons()
-            print(f"DEBUG: Single image loaded successfully")
+            logger.debug("Single image loaded successfully")
         else:
-            print(f"DEBUG: No file selected")
+            logger.debug("No file selected")
             
     def load_multiple_images(self):
         """Load multiple image files"""
-        print(f"DEBUG: load_multiple_images called")
+        logger.debug("load_multiple_images called")
         
         file_paths = filedialog.askopenfilenames(
             title="Select Multiple Images",
@@ -272,25 +287,20 @@ class FileMenu:
         )
         
         if file_paths:
-            print(f"DEBUG: Selected {len(file_paths)} files")
-            self.editor.save_state()  # Save state for undo
-            for file_path in file_paths:
-                print(f"DEBUG: Loading file: {file_path}")
-                self.editor.add_image(file_path)
-            self.update_image_list()
-            self.update_buttons()
-            print(f"DEBUG: Multiple images loaded successfully")
+            logger.debug("Selected %s files", len(file_paths))
+            # Decoded in the background, added as one undo entry when done
+            self.editor.import_images(file_paths, "Load multiple images", on_done=self.on_images_imported)
         else:
-            print(f"DEBUG: No files selected")
+            logger.debug("No files selected")
             
     def load_images_from_folder(self):
         """Load all images from a selected folder"""
-        print(f"DEBUG: load_images_from_folder called")
+        logger.debug("load_images_from_folder called")
         
         folder_path = filedialog.askdirectory(title="Select Folder with Images")
         
         if folder_path:
-            print(f"DEBUG: Selected folder: {folder_path}")
+            logger.debug("Selected folder: %s", folder_path)
             image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff'}
             image_files = []
             
@@ -298,29 +308,39 @@ class FileMenu:
                 if any(file.lower().endswith(ext) for ext in image_extensions):
                     image_files.append(os.path.join(folder_path, file))
             
-            print(f"DEBUG: Found {len(image_files)} image files in folder")
+            logger.debug("Found %s image files in folder", len(image_files))
             
             if image_files:
-                self.editor.save_state()  # Save state for undo
-                for file_path in sorted(image_files):
-                    print(f"DEBUG: Loading file: {file_path}")
-                    self.editor.add_image(file_path)
-                self.update_image_list()
-                self.update_buttons()
-                messagebox.showinfo("Success", f"Loaded {len(image_files)} images from folder")
-                print(f"DEBUG: Folder images loaded successfully")
+                def on_folder_imported(loaded_count, cancelled):
+                    self.on_images_imported(loaded_count, cancelled)
+                    if not cancelled:
+                        messagebox.showinfo("Success", f"Loaded {loaded_count} images from folder")
+                        logger.debug("Folder images loaded successfully")
+                
+                # Decoded in the background, added as one undo entry when done
+                self.editor.import_images(sorted(image_files), "Load folder", on_done=on_folder_imported)
             else:
                 messagebox.showwarning("No Images", "No image files found in the selected folder")
-                print(f"DEBUG: No image files found in folder")
+                logger.debug("No image files found in folder")
         else:
-            print(f"DEBUG: No folder selected")
+            logger.debug("No folder selected")
+            
+    def on_images_imported(self, loaded_count, cancelled):
+        """Refresh the image list after a background import finished"""
+        logger.debug("Images imported - loaded: %s, cancelled: %s", loaded_count, cancelled)
+        try:
+            self.update_image_list()
+            self.update_buttons()
+        except tk.TclError:
+            # File menu window was closed while the import was running
+            pass
             
     def bring_to_front(self):
         """Bring selected image to front of stack"""
-        print(f"DEBUG: bring_to_front called - selected_index: {self.editor.selected_image_index}")
+        logger.debug("bring_to_front called - selected_index: %s", self.editor.selected_image_index)
         
         if self.editor.images and self.editor.selected_image_index >= 0:
-            print(f"DEBUG: Bringing image {self.editor.selected_image_index} to front")
+            logger.debug("Bringing image %s to front", self.editor.selected_image_index)
             self.editor.save_state()
             
             selected_index = self.editor.selected_image_index
@@ -332,15 +352,11 @@ class FileMenu:
             
             # Get the selected image
             selected_img = self.editor.images[selected_index]
-            print(f"DEBUG: Selected image: {os.path.basename(selected_img['path'])}")
+            logger.debug("Selected image: %s", os.path.basename(selected_img['path']))
             
-            # Remove from current position
-            self.editor.images.pop(selected_index)
-            print(f"DEBUG: Removed image from index {selected_index}")
-            
-            # Add to end (top of visual stack)
-            self.editor.images.append(selected_img)
-            print(f"DEBUG: Added image to end of stack at index {len(self.editor.images) - 1}")
+            # Move to end (top of visual stack), raising only its canvas item
+            self.editor.move_layer(selected_index, len(self.editor.images) - 1)
+            logger.debug("Moved image from index %s to end of stack at index %s", selected_index, len(self.editor.images) - 1)
             
             # Update selected index to point to the moved image
             self.editor.selected_image_index = len(self.editor.images) - 1
@@ -354,28 +370,22 @@ class FileMenu:
             # Recreate image stack with correct order
             self.editor.image_stack = list(range(len(self.editor.images)))
             
-            print(f"DEBUG: Updated indices - selected: {self.editor.selected_image_index}, current: {self.editor.current_image_index}")
+            logger.debug("Updated indices - selected: %s, current: %s", self.editor.selected_image_index, self.editor.current_image_index)
             
-            # Update canvas with new order
-            self.editor.update_canvas()
+            # Restore the highlight (the canvas items are already in the new order)
+            self.editor.request_redraw()
             self.update_image_list()
             self.update_buttons()
             self.editor.update_image_info()
-            
-            # Ensure highlight is restored
-            if self.editor.selected_image_index >= 0:
-                self.editor.selected_image = self.editor.images[self.editor.selected_image_index]
-                self.editor.highlight_selected_image()
-                print(f"DEBUG: Highlight restored for moved image")
         else:
-            print(f"DEBUG: Cannot bring to front - images: {len(self.editor.images)}, selected_index: {self.editor.selected_image_index}")
+            logger.debug("Cannot bring to front - images: %s, selected_index: %s", len(self.editor.images), self.editor.selected_image_index)
             
     def bring_to_back(self):
         """Send selected image to back of stack"""
-        print(f"DEBUG: bring_to_back called - selected_index: {self.editor.selected_image_index}")
+        logger.debug("bring_to_back called - selected_index: %s", self.editor.selected_image_index)
         
         if self.editor.images and self.editor.selected_image_index >= 0:
-            print(f"DEBUG: Sending image {self.editor.selected_image_index} to back")
+            logger.debug("Sending image %s to back", self.editor.selected_image_index)
             self.editor.save_state()
             
             selected_index = self.editor.selected_image_index
@@ -387,15 +397,11 @@ class FileMenu:
                 
             # Get the selected image
             selected_img = self.editor.images[selected_index]
-            print(f"DEBUG: Selected image: {os.path.basename(selected_img['path'])}")
+            logger.debug("Selected image: %s", os.path.basename(selected_img['path']))
             
-            # Remove from current position
-            self.editor.images.pop(selected_index)
-            print(f"DEBUG: Removed image from index {selected_index}")
-            
-            # Add to beginning (bottom of visual stack)
-            self.editor.images.insert(0, selected_img)
-            print(f"DEBUG: Added image to beginning of stack at index 0")
+            # Move to beginning (bottom of visual stack), lowering only its canvas item
+            self.editor.move_layer(selected_index, 0)
+            logger.debug("Moved image from index %s to beginning of stack at index 0", selected_index)
             
             # Update selected index to point to the moved image
             self.editor.selected_image_index = 0
@@ -409,28 +415,22 @@ class FileMenu:
             # Recreate image stack with correct order
             self.editor.image_stack = list(range(len(self.editor.images)))
             
-            print(f"DEBUG: Updated indices - selected: {self.editor.selected_image_index}, current: {self.editor.current_image_index}")
+            logger.debug("Updated indices - selected: %s, current: %s", self.editor.selected_image_index, self.editor.current_image_index)
             
-            # Update canvas with new order
-            self.editor.update_canvas()
+            # Restore the highlight (the canvas items are already in the new order)
+            self.editor.request_redraw()
             self.update_image_list()
             self.update_buttons()
             self.editor.update_image_info()
-            
-            # Ensure highlight is restored
-            if self.editor.selected_image_index >= 0:
-                self.editor.selected_image = self.editor.images[self.editor.selected_image_index]
-                self.editor.highlight_selected_image()
-                print(f"DEBUG: Highlight restored for moved image")
         else:
-            print(f"DEBUG: Cannot send to back - images: {len(self.editor.images)}, selected_index: {self.editor.selected_image_index}")
+            logger.debug("Cannot send to back - images: %s, selected_index: %s", len(self.editor.images), self.editor.selected_image_index)
             
     def delete_selected_image(self):
         """Delete the currently selected image"""
-        print(f"DEBUG: delete_selected_image called - selected_index: {self.editor.selected_image_index}")
+        logger.debug("delete_selected_image called - selected_index: %s", self.editor.selected_image_index)
         
         if not self.editor.images or self.editor.selected_image_index < 0:
-            print(f"DEBUG: Cannot delete - images: {len(self.editor.images)}, selected_index: {self.editor.selected_image_index}")
+            logger.debug("Cannot delete - images: %s, selected_index: %s", len(self.editor.images), self.editor.selected_image_index)
             return
             
         # Get the selected image info for confirmation
@@ -439,17 +439,12 @@ class FileMenu:
         
         # Ask for confirmation
         if messagebox.askyesno("Delete Image", f"Are you sure you want to delete '{filename}'?"):
-            print(f"DEBUG: User confirmed deletion of image: {filename}")
+            logger.debug("User confirmed deletion of image: %s", filename)
             self.editor.save_state()  # Save state for undo
             
-            # Remove the image from canvas
-            if 'id' in selected_img:
-                self.editor.canvas.delete(selected_img['id'])
-                print(f"DEBUG: Removed image from canvas with ID: {selected_img['id']}")
-            
-            # Remove from images list
-            self.editor.images.pop(self.editor.selected_image_index)
-            print(f"DEBUG: Removed image from images list at index {self.editor.selected_image_index}")
+            # Remove from images list and its item from canvas
+            self.editor.remove_layer(self.editor.selected_image_index)
+            logger.debug("Removed image from images list at index %s", self.editor.selected_image_index)
             
             # Update indices
             if self.editor.current_image_index == self.editor.selected_image_index:
@@ -467,32 +462,45 @@ class FileMenu:
                 self.editor.highlight_rect = None
             
             # Update UI
-            self.editor.update_canvas()
+            self.editor.request_redraw()
             self.update_image_list()
             self.update_buttons()
             self.editor.update_image_info()
             self.editor.update_status(f"Deleted image: {filename}")
             
-            print(f"DEBUG: Image deletion completed successfully")
+            logger.debug("Image deletion completed successfully")
         else:
-            print(f"DEBUG: User cancelled image deletion")
+            logger.debug("User cancelled image deletion")
             
+    def toggle_selected_visibility(self):
+        """Hide the selected image, or show it again if it is hidden"""
+        if not self.editor.images or self.editor.selected_image_index < 0:
+            return
+        
+        img_data = self.editor.images[self.editor.selected_image_index]
+        self.editor.save_state()  # Save state for undo
+        self.editor.set_layer_visible(self.editor.selected_image_index, not img_data['visible'])
+        
+        self.update_image_list()
+        filename = os.path.basename(img_data['path'])
+        self.editor.update_status(f"{'Shown' if img_data['visible'] else 'Hidden'} image: {filename}")
+        
     def on_image_select(self, event):
         """Handle image selection in listbox"""
         selection = self.image_listbox.curselection()
-        print(f"DEBUG: Image selection event - selection: {selection}")
+        logger.debug("Image selection event - selection: %s", selection)
         
         if selection:
             # Convert from reverse order (top to bottom) to actual index
             list_index = selection[0]
             actual_index = len(self.editor.images) - 1 - list_index
-            print(f"DEBUG: Converting list index {list_index} to actual index {actual_index}")
+            logger.debug("Converting list index %s to actual index %s", list_index, actual_index)
             
             self.editor.current_image_index = actual_index
             self.editor.update_image_info()
-            print(f"DEBUG: Updated current image index to {actual_index}")
+            logger.debug("Updated current image index to %s", actual_index)
         else:
-            print(f"DEBUG: No image selected in listbox")
+            logger.debug("No image selected in listbox")
             
     def save_current_image(self):
         """Save the currently selected image"""
@@ -514,14 +522,14 @@ class FileMenu:
         
         if file_path:
             try:
-                current_img = self.editor.images[self.editor.current_image_index]['image']
+                current_img_data = self.editor.images[self.editor.current_image_index]
+                
+                # Export at source resolution with the layer's edits replayed
+                current_img = self.editor.get_full_resolution_image(current_img_data)
                 
-                # Apply rotation if needed
-                if self.editor.images[self.editor.current_image_index]['rotation'] != 0:
-                    current_img = current_img.rotate(
-                        self.editor.images[self.editor.current_image_index]['rotation'], 
-                        expand=True
-                    )
+                # Apply rotation if needed (full resolution rotations are not cached)
+                if current_img_data['rotation'] != 0:
+                    current_img = current_img.rotate(current_img_data['rotation'], expand=True)
                 
                 current_img.save(file_path)
                 self.editor.update_status(f"Saved: {os.path.basename(file_path)}")
@@ -554,11 +562,8 @@ class FileMenu:
                 
                 for img_data in self.editor.images:
                     if img_data['visible']:
-                        img = img_data['image'].copy()
-                        
-                        # Apply rotation if needed
-                        if img_data['rotation'] != 0:
-                            img = img.rotate(img_data['rotation'], expand=True)
+                        # Apply rotation if needed (cached images are never modified below)
+                        img = rotate_layer_image(img_data['image'], img_data['rotation'], img_data['version'])
                         
                         # Convert to RGBA if needed
                         if img.mode != 'RGBA':
@@ -601,11 +606,8 @@ class FileMenu:
                 # Process images in the order they appear on canvas (bottom to top)
                 for img_data in self.editor.images:
                     if img_data['visible']:
-                        img = img_data['image'].copy()
-                        
-                        # Apply rotation if needed
-                        if img_data['rotation'] != 0:
-                            img = img.rotate(img_data['rotation'], expand=True)
+                        # Apply rotation if needed (cached images are never modified below)
+                        img = rotate_layer_image(img_data['image'], img_data['rotation'], img_data['version'])
                         
                         # Convert to RGBA if needed
                         if img.mode != 'RGBA':
@@ -655,7 +657,7 @@ class FileMenu:
                 self.editor.save_state()
                 self.editor.images.clear()
                 self.editor.current_image_index = -1
-                self.editor.update_canvas()
+                self.editor.request_redraw()
                 self.update_image_list()
                 self.update_buttons()
                 self.editor.update_image_info()
@@ -663,7 +665,7 @@ class FileMenu:
                 
     def update_image_list(self):
         """Update the image listbox display"""
-        print(f"DEBUG: Updating image list - total images: {len(self.editor.images)}")
+        logger.debug("Updating image list - total images: %s", len(self.editor.images))
         
         self.image_listbox.delete(0, tk.END)
         
@@ -672,20 +674,22 @@ class FileMenu:
             for i in range(len(self.editor.images) - 1, -1, -1):
                 img_data = self.editor.images[i]
                 filename = os.path.basename(img_data['path'])
+                if not img_data['visible']:
+                    filename += " (hidden)"
                 self.image_listbox.insert(0, filename)
-                print(f"DEBUG: Added image {i} to list: {filename}")
+                logger.debug("Added image %s to list: %s", i, filename)
                 
             # Update current image label
             if self.editor.current_image_index >= 0:
                 current_img = self.editor.images[self.editor.current_image_index]
                 self.current_image_label.configure(text=f"Current: {os.path.basename(current_img['path'])}")
-                print(f"DEBUG: Updated current image label to: {os.path.basename(current_img['path'])}")
+                logger.debug("Updated current image label to: %s", os.path.basename(current_img['path']))
             else:
                 self.current_image_label.configure(text="No current image")
-                print(f"DEBUG: No current image to display")
+                logger.debug("No current image to display")
         else:
             self.current_image_label.configure(text="No images loaded")
-            print(f"DEBUG: No images to display in list")
+            logger.debug("No images to display in list")
             
     def update_buttons(self):
         """Update button states based on current state"""
@@ -693,16 +697,17 @@ class FileMenu:
         has_current = self.editor.current_image_index >= 0
         has_selected = self.editor.selected_image_index >= 0
         
-        print(f"DEBUG: Updating file menu buttons - has_images: {has_images}, has_current: {has_current}, has_selected: {has_selected}")
+        logger.debug("Updating file menu buttons - has_images: %s, has_current: %s, has_selected: %s", has_images, has_current, has_selected)
         
         # Stack management buttons - require selected image
         self.bring_front_btn.configure(state="normal" if has_selected else "disabled")
         self.bring_back_btn.configure(state="normal" if has_selected else "disabled")
         self.delete_btn.configure(state="normal" if has_selected else "disabled")
+        self.visibility_btn.configure(state="normal" if has_selected else "disabled")
         
         # Save buttons
         self.save_current_btn.configure(state="normal" if has_current else "disabled")
         self.save_composite_btn.configure(state="normal" if has_images else "disabled")
         self.save_canvas_btn.configure(state="normal" if has_images else "disabled")
         
-        print(f"DEBUG: File menu buttons updated successfully")
+        logger.debug("File menu buttons updated successfully")
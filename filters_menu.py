@@ -1,11 +1,181 @@
+import os
 import customtkinter as ctk
 import tkinter as tk
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+from PIL import Image, ImageEnhance, ImageOps, ImageFilter, ImageStat
 import numpy as np
 
+from background_tasks import BackgroundBatch, LatestOnlyWorker
+from debug_log import get_logger
+from image_cache import ImageLRUCache
+
+logger = get_logger(__name__)
+
+# Filter results by (pixel version, filter, parameters), so comparing filters
+# or re-applying one after undo reuses the earlier result
+FILTER_CACHE_BYTES = 192 * 1024 * 1024
+filter_cache = ImageLRUCache(FILTER_CACHE_BYTES, name="filter")
+
+
+def filter_image(img, filter_type):
+    """Apply a specific filter to an image"""
+    logger.debug("Applying filter '%s' to image with mode '%s' and size %s", filter_type, img.mode, img.size)
+    
+    try:
+        if filter_type == "sepia":
+            result = sepia_image(img)
+        elif filter_type == "grayscale":
+            result = img.convert('L').convert('RGB')
+        elif filter_type == "invert":
+            result = ImageOps.invert(img)
+        elif filter_type == "darker":
+            enhancer = ImageEnhance.Brightness(img)
+            result = enhancer.enhance(0.5)
+        elif filter_type == "lighter":
+            enhancer = ImageEnhance.Brightness(img)
+            result = enhancer.enhance(1.5)
+        elif filter_type == "contrast":
+            enhancer = ImageEnhance.Contrast(img)
+            result = enhancer.enhance(2.0)
+        elif filter_type == "blur":
+            result = img.filter(ImageFilter.BLUR)
+        elif filter_type == "sharpen":
+            result = img.filter(ImageFilter.SHARPEN)
+        elif filter_type == "edge":
+            result = img.filter(ImageFilter.FIND_EDGES)
+        elif filter_type == "emboss":
+            result = img.filter(ImageFilter.EMBOSS)
+        elif filter_type == "posterize":
+            result = img.quantize(colors=8).convert('RGB')
+        elif filter_type == "solarize":
+            result = ImageOps.solarize(img, threshold=128)
+        else:
+            logger.debug("Unknown filter type '%s'", filter_type)
+            result = img
+            
+        logger.debug("Filter '%s' applied successfully, result mode: '%s', size: %s", filter_type, result.mode, result.size)
+        return result
+        
+    except Exception as e:
+        logger.warning("Error applying filter '%s': %s", filter_type, e)
+        import traceback
+        traceback.print_exc()
+        return img
+
+
+def sepia_image(img):
+    """Apply sepia filter to image"""
+    # Convert to RGB if needed
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+        
+    # Convert to numpy array
+    img_array = np.array(img)
+    
+    # Sepia transformation matrix
+    sepia_matrix = np.array([
+        [0.393, 0.769, 0.189],
+        [0.349, 0.686, 0.168],
+        [0.272, 0.534, 0.131]
+    ])
+    
+    # Apply transformation
+    sepia_img = np.dot(img_array, sepia_matrix.T)
+    
+    # Clip values to 0-255 range
+    sepia_img = np.clip(sepia_img, 0, 255).astype(np.uint8)
+    
+    return Image.fromarray(sepia_img)
+
+
+def blend_lut(degenerate, factor):
+    """Return Image.blend(constant degenerate, image, factor) as a 256-entry table for one band
+    
+    Built with Image.blend itself, so float precision, clipping and truncation
+    match ImageEnhance exactly.
+    """
+    ramp = Image.frombytes('L', (256, 1), bytes(range(256)))
+    return list(Image.blend(Image.new('L', (256, 1), degenerate), ramp, factor).tobytes())
+
+
+def rgb_lut(brightness_factor, contrast_factor, red_factor, green_factor, blue_factor, contrast_mean=0):
+    """Compile the RGB adjustments into one 768-entry table for Image.point
+    
+    contrast_mean is the value ImageEnhance.Contrast would blend towards, the
+    rounded mean luminance of the image after the brightness change.
+    """
+    table = np.arange(256, dtype=np.uint8)
+    if brightness_factor != 1.0:
+        table = np.array(blend_lut(0, brightness_factor), dtype=np.uint8)[table]
+    if contrast_factor != 1.0:
+        table = np.array(blend_lut(contrast_mean, contrast_factor), dtype=np.uint8)[table]
+    
+    # Same float64 multiply, clip and truncating store as the per-pixel numpy version did
+    bands = []
+    for factor in (red_factor, green_factor, blue_factor):
+        band = table.copy()
+        if factor != 1.0:
+            band[:] = np.clip(table * factor, 0, 255)
+        bands.append(band)
+    return np.concatenate(bands).tolist()
+
+
+def adjust_rgb(img, brightness_factor, contrast_factor, red_factor, green_factor, blue_factor):
+    """Apply RGB adjustments to an image in a single Image.point pass"""
+    # Convert to RGB if needed
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+        
+    if brightness_factor == contrast_factor == red_factor == green_factor == blue_factor == 1.0:
+        return img
+        
+    # Contrast blends towards the mean luminance of the brightness-adjusted image
+    contrast_mean = 0
+    if contrast_factor != 1.0:
+        brightened = img
+        if brightness_factor != 1.0:
+            brightened = img.point(blend_lut(0, brightness_factor) * 3)
+        contrast_mean = int(ImageStat.Stat(brightened.convert('L')).mean[0] + 0.5)
+        
+    lut = rgb_lut(brightness_factor, contrast_factor, red_factor, green_factor, blue_factor, contrast_mean)
+    return img.point(lut)
+
+
+# Edit functions recorded on layers and replayed on the full-resolution source at export
+def cached_filter(func, img, version, name, params=()):
+    """Return func(img, *params), reusing the cached result for the same pixel version
+    
+    The returned image may be shared with the cache and must not be modified in place.
+    """
+    if version is None:
+        return func(img, *params)
+        
+    key = (version, name, params)
+    result = filter_cache.get(key)
+    if result is None:
+        result = func(img, *params)
+        if result is not img:  # Unchanged (or failed) results would only pin the source
+            filter_cache.put(key, result)
+    return result
+
+
+def filter_edit(img, scale, filter_type):
+    """Replay a standard filter"""
+    return filter_image(img, filter_type)
+
+
+def rgb_edit(img, scale, factors):
+    """Replay custom RGB adjustments"""
+    return adjust_rgb(img, **factors)
+
+
 class FiltersMenu:
     def __init__(self, editor):
         self.editor = editor
+        self.preview_layer = None  # Layer currently showing the live RGB preview
+        self.preview_source = None  # ((uid, version, scale), its pixels scaled to the screen)
+        # Previews are computed off the Tk thread, only for the newest slider state
+        self.preview_worker = LatestOnlyWorker(editor.root, self.compute_live_preview,
+                                               self.show_live_preview, self.on_live_preview_error)
         self.create_filters_window()
         
     def create_filters_window(self):
@@ -20,6 +190,8 @@ class FiltersMenu:
         
         # Add close protocol
         self.filters_window.protocol("WM_DELETE_WINDOW", self.close_window)
+        # However the window goes away, the preview worker must stop posting results
+        self.filters_window.bind("<Destroy>", self.on_window_destroyed, add="+")
         
         # Create main frame
         main_frame = ctk.CTkFrame(self.filters_window)
@@ -40,8 +212,15 @@ class FiltersMenu:
     
     def close_window(self):
         """Close the filters menu window"""
+        self.clear_live_preview()
+        self.preview_worker.close()
         self.filters_window.destroy()
         
+    def on_window_destroyed(self, event):
+        """Stop the preview worker when the window itself (not one of its children) is destroyed"""
+        if event.widget is self.filters_window:
+            self.preview_worker.close()
+            
     def create_standard_filters_section(self, parent):
         """Create the standard filters section"""
         filters_frame = ctk.CTkFrame(parent)
@@ -393,45 +572,68 @@ class FiltersMenu:
         # Update labels
         self.on_rgb_change(0)
         
-        # Restore original image colors
-        if self.editor.images and self.editor.selected_image_index >= 0:
-            self.restore_original_colors()
+        # Show the layer's own colors again
+        self.clear_live_preview()
+        self.editor.update_status("RGB values reset")
         
     def apply_live_preview(self):
-        """Apply RGB adjustments for live preview without saving state"""
-        try:
-            selected_img_data = self.editor.images[self.editor.selected_image_index]
-            
-            # Get original image for preview
-            if 'original_image' in selected_img_data:
-                img = selected_img_data['original_image'].copy()
-            else:
-                img = selected_img_data['image'].copy()
-            
-            # Apply RGB adjustments
-            img = self.apply_rgb_adjustments(img)
-            
-            # Update image for preview (don't save state)
-            selected_img_data['image'] = img
-            self.editor.update_canvas()
-            
-        except Exception as e:
-            print(f"Error in live preview: {e}")
+        """Show the RGB adjustments on a screen-resolution copy of the selected image
         
-    def restore_original_colors(self):
-        """Restore original image colors"""
+        The layer itself is not changed, Apply runs the adjustment on its pixels once.
+        The copy is computed on the preview worker, so dragging a slider never waits for it.
+        """
         try:
             selected_img_data = self.editor.images[self.editor.selected_image_index]
+            if self.preview_layer is not None and self.preview_layer is not selected_img_data:
+                self.clear_live_preview()
+            
+            # Read everything from Tk here, the worker only sees this snapshot
+            self.preview_worker.submit((selected_img_data, selected_img_data['image'], selected_img_data['version'],
+                                        self.editor.preview_scale(), self.get_rgb_factors()))
             
-            if 'original_image' in selected_img_data:
-                selected_img_data['image'] = selected_img_data['original_image'].copy()
-                self.editor.update_canvas()
-                self.editor.update_status("RGB values reset - original colors restored")
-            else:
-                self.editor.update_status("Original image not available")
-                
         except Exception as e:
-            print(f"Error restoring colors: {e}")
+            logger.warning("Error in live preview: %s", e)
+            
+    def compute_live_preview(self, request):
+        """Worker thread: scale the layer to the screen and apply the RGB adjustments"""
+        img_data, img, version, scale, factors = request
+        return adjust_rgb(self.get_preview_source(img_data['uid'], version, img, scale), **factors)
+        
+    def show_live_preview(self, request, img):
+        """Tk thread: show a finished preview unless its layer changed or lost the selection meanwhile"""
+        if not self.filters_window.winfo_exists():
+            return  # The menu was closed, nothing could clear this preview any more
+        img_data, _, version, _, _ = request
+        images = self.editor.images
+        index = self.editor.selected_image_index
+        if not (0 <= index < len(images) and images[index] is img_data and img_data['version'] == version):
+            return
+        self.editor.set_layer_preview(img_data, img)
+        self.preview_layer = img_data
+        logger.debug("Live preview shown, %s stale requests skipped so far", self.preview_worker.dropped)
+        
+    def on_live_preview_error(self, request, error):
+        """Tk thread: report a preview that failed on the worker"""
+        logger.warning("Error in live preview: %s", error)
+        
+    def get_preview_source(self, uid, version, img, scale):
+        """Return the layer's pixels scaled to the screen, cached while the layer and zoom stay the same"""
+        key = (uid, version, scale)
+        source = self.preview_source
+        if source is None or source[0] != key:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            if size != img.size:
+                img = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+            source = self.preview_source = (key, img)
+        return source[1]
+        
+    def clear_live_preview(self):
+        """Drop the live preview, the layer shows its own pixels again"""
+        self.preview_worker.cancel()
+        if self.preview_layer is not None:
+            self.editor.set_layer_preview(self.preview_layer, None)
+            self.preview_layer = None
+        self.preview_source = None
         
     def toggle_live_preview(self):
         """Toggle live preview on/off"""
@@ -441,14 +643,15 @@ class FiltersMenu:
             if self.editor.images and self.editor.selected_image_index >= 0:
                 self.apply_live_preview()
         else:
+            self.clear_live_preview()
             self.editor.update_status("Live preview disabled - click Apply to see changes")
         
     def apply_filter(self, filter_type):
         """Apply a standard filter to images based on target selection"""
-        print(f"DEBUG: Applying filter '{filter_type}'")
-        print(f"DEBUG: Total images: {len(self.editor.images)}")
-        print(f"DEBUG: Selected image index: {self.editor.selected_image_index}")
-        print(f"DEBUG: Target: {self.target_var.get()}")
+        logger.debug("Applying filter '%s'", filter_type)
+        logger.debug("Total images: %s", len(self.editor.images))
+        logger.debug("Selected image index: %s", self.editor.selected_image_index)
+        logger.debug("Target: %s", self.target_var.get())
         
         if not self.editor.images:
             self.editor.update_status("No images loaded")
@@ -467,105 +670,44 @@ class FiltersMenu:
                 self.editor.update_status("No images loaded")
                 return
             
-        self.editor.save_state()
-        
-        try:
-            if target == "current":
+        if target != "current":
+            # Apply to all images, in parallel
+            logger.debug("Applying to all %s images", len(self.editor.images))
+            self.apply_to_all_layers(f"Apply {filter_type} filter",
+                                     lambda img, version: self.apply_filter_to_image(img, filter_type, version),
+                                     (filter_edit, {'filter_type': filter_type}),
+                                     f"Applied {filter_type} filter to all images")
+            return
+            
+        with self.editor.transaction(f"Apply {filter_type} filter"):
+            try:
                 # Apply to selected image only
                 selected_img_data = self.editor.images[self.editor.selected_image_index]
-                print(f"DEBUG: Applying to selected image at index {self.editor.selected_image_index}")
-                img = selected_img_data['image'].copy()
-                img = self.apply_filter_to_image(img, filter_type)
-                selected_img_data['image'] = img
+                logger.debug("Applying to selected image at index %s", self.editor.selected_image_index)
+                img = self.apply_filter_to_image(selected_img_data['image'], filter_type, selected_img_data['version'])
+                self.editor.set_layer_image(selected_img_data, img, (filter_edit, {'filter_type': filter_type}))
                 self.editor.update_status(f"Applied {filter_type} filter to selected image")
-            else:
-                # Apply to all images
-                print(f"DEBUG: Applying to all {len(self.editor.images)} images")
-                for i, img_data in enumerate(self.editor.images):
-                    img = img_data['image'].copy()
-                    img = self.apply_filter_to_image(img, filter_type)
-                    img_data['image'] = img
-                self.editor.update_status(f"Applied {filter_type} filter to all images")
+                    
+                self.editor.request_redraw()
+                logger.debug("Filter cache: %(hits)s hits, %(misses)s misses (hit rate %(hit_rate).2f), %(entries)s entries, %(bytes)s bytes",
+                             filter_cache.stats())
                 
-            self.editor.update_canvas()
-            
-            # Update button states after applying filter
-            self.update_apply_buttons()
-            
-        except Exception as e:
-            self.editor.update_status(f"Error applying filter: {str(e)}")
-            print(f"Filter error: {e}")
-            import traceback
-            traceback.print_exc()
-            
-    def apply_filter_to_image(self, img, filter_type):
-        """Apply a specific filter to an image"""
-        print(f"DEBUG: Applying filter '{filter_type}' to image with mode '{img.mode}' and size {img.size}")
-        
-        try:
-            if filter_type == "sepia":
-                result = self.apply_sepia_filter(img)
-            elif filter_type == "grayscale":
-                result = img.convert('L').convert('RGB')
-            elif filter_type == "invert":
-                result = ImageOps.invert(img)
-            elif filter_type == "darker":
-                enhancer = ImageEnhance.Brightness(img)
-                result = enhancer.enhance(0.5)
-            elif filter_type == "lighter":
-                enhancer = ImageEnhance.Brightness(img)
-                result = enhancer.enhance(1.5)
-            elif filter_type == "contrast":
-                enhancer = ImageEnhance.Contrast(img)
-                result = enhancer.enhance(2.0)
-            elif filter_type == "blur":
-                result = img.filter(ImageFilter.BLUR)
-            elif filter_type == "sharpen":
-                result = img.filter(ImageFilter.SHARPEN)
-            elif filter_type == "edge":
-                result = img.filter(ImageFilter.FIND_EDGES)
-            elif filter_type == "emboss":
-                result = img.filter(ImageFilter.EMBOSS)
-            elif filter_type == "posterize":
-                result = img.quantize(colors=8).convert('RGB')
-            elif filter_type == "solarize":
-                result = ImageOps.solarize(img, threshold=128)
-            else:
-                print(f"DEBUG: Unknown filter type '{filter_type}'")
-                result = img
+                # Update button states after applying filter
+                self.update_apply_buttons()
                 
-            print(f"DEBUG: Filter '{filter_type}' applied successfully, result mode: '{result.mode}', size: {result.size}")
-            return result
-            
-        except Exception as e:
-            print(f"DEBUG: Error applying filter '{filter_type}': {e}")
-            import traceback
-            traceback.print_exc()
-            return img
+            except Exception as e:
+                self.editor.update_status(f"Error applying filter: {str(e)}")
+                logger.warning("Filter error: %s", e)
+                import traceback
+                traceback.print_exc()
             
+    def apply_filter_to_image(self, img, filter_type, version=None):
+        """Apply a specific filter to an image, cached by pixel version when one is given"""
+        return cached_filter(filter_image, img, version, filter_type, (filter_type,))
+        
     def apply_sepia_filter(self, img):
         """Apply sepia filter to image"""
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-            
-        # Convert to numpy array
-        img_array = np.array(img)
-        
-        # Sepia transformation matrix
-        sepia_matrix = np.array([
-            [0.393, 0.769, 0.189],
-            [0.349, 0.686, 0.168],
-            [0.272, 0.534, 0.131]
-        ])
-        
-        # Apply transformation
-        sepia_img = np.dot(img_array, sepia_matrix.T)
-        
-        # Clip values to 0-255 range
-        sepia_img = np.clip(sepia_img, 0, 255).astype(np.uint8)
-        
-        return Image.fromarray(sepia_img)
+        return sepia_image(img)
         
     def apply_rgb_to_current(self):
         """Apply custom RGB adjustments to selected image"""
@@ -580,15 +722,16 @@ class FiltersMenu:
         self.editor.save_state()
         
         selected_img_data = self.editor.images[self.editor.selected_image_index]
-        img = selected_img_data['image'].copy()
         
         try:
             # Apply RGB adjustments
-            img = self.apply_rgb_adjustments(img)
+            factors = self.get_rgb_factors()
+            img = self.apply_rgb_adjustments(selected_img_data['image'], factors, selected_img_data['version'])
             
-            # Update the image
-            selected_img_data['image'] = img
-            self.editor.update_canvas()
+            # Update the image, the preview is replaced by the real result
+            self.editor.set_layer_image(selected_img_data, img, (rgb_edit, {'factors': factors}))
+            self.clear_live_preview()
+            self.editor.request_redraw()
             self.editor.update_status("Applied custom RGB adjustments to selected image")
             
             # Update button states
@@ -596,7 +739,7 @@ class FiltersMenu:
             
         except Exception as e:
             self.editor.update_status(f"Error applying RGB adjustments: {str(e)}")
-            print(f"RGB error: {e}")
+            logger.warning("RGB error: %s", e)
             
     def apply_rgb_to_all(self):
         """Apply custom RGB adjustments to all images"""
@@ -604,61 +747,100 @@ class FiltersMenu:
             self.editor.update_status("No images loaded")
             return
             
-        self.editor.save_state()
-        
-        try:
-            for img_data in self.editor.images:
-                img = img_data['image'].copy()
-                img = self.apply_rgb_adjustments(img)
-                img_data['image'] = img
-                
-            self.editor.update_canvas()
-            self.editor.update_status("Applied custom RGB adjustments to all images")
-            
-            # Update button states
-            self.update_apply_buttons()
-            
-        except Exception as e:
-            self.editor.update_status(f"Error applying RGB adjustments: {str(e)}")
-            print(f"RGB all error: {e}")
+        factors = self.get_rgb_factors()
+        self.apply_to_all_layers("Apply RGB to all images",
+                                 lambda img, version: self.apply_rgb_adjustments(img, factors, version),
+                                 (rgb_edit, {'factors': factors}),
+                                 "Applied custom RGB adjustments to all images")
+        
+    def apply_to_all_layers(self, label, func, edit, done_message):
+        """Run func(image, version) for every layer in a thread pool with a progress window
+        
+        Pillow releases the GIL while filtering, so the layers are processed in parallel.
+        The results are applied on the Tk thread as one undo entry, or not at all if cancelled.
+        """
+        # The batch lives on the editor, the menu is rebuilt every time Filters is opened
+        if self.editor.filter_batch is not None:
+            self.editor.update_status("Still applying to all images, wait or cancel first")
+            return
             
+        layers = list(self.editor.images)
+        # Workers only get the pixels and their version, the layers stay on the Tk thread
+        jobs = [(img_data['image'], img_data['version']) for img_data in layers]
+        
+        progress_window = ctk.CTkToplevel(self.editor.root)
+        progress_window.title(label)
+        progress_window.geometry("360x130")
+        progress_window.resizable(False, False)
+        progress_window.transient(self.editor.root)
+        
+        progress_label = ctk.CTkLabel(progress_window, text=f"Filtering 0 of {len(jobs)} images...")
+        progress_label.pack(pady=(15, 5))
+        progress_bar = ctk.CTkProgressBar(progress_window)
+        progress_bar.pack(fill="x", padx=20, pady=5)
+        progress_bar.set(0)
+        
+        def on_progress(completed, total):
+            progress_label.configure(text=f"Filtering {completed} of {total} images...")
+            progress_bar.set(completed / total if total else 1)
+            
+        def on_finished(results, errors, cancelled):
+            self.editor.filter_batch = None
+            progress_window.destroy()
+            for _, error in errors:
+                logger.warning("Error in %s: %s", label, error)
+            
+            if cancelled:
+                self.editor.update_status(f"{label} cancelled")
+                return
+                
+            skipped = 0
+            with self.editor.transaction(label):
+                for img_data, (_, version), img in zip(layers, jobs, results):
+                    # Layers removed or edited while the workers ran keep their newer state
+                    if img is None or img_data['version'] != version or img_data not in self.editor.images:
+                        skipped += 1
+                        continue
+                    self.editor.set_layer_image(img_data, img, edit)
+            
+            self.editor.request_redraw()
+            self.editor.update_status(done_message + (f", {skipped} skipped" if skipped else ""))
+            logger.debug("%s finished - errors: %s, skipped: %s", label, len(errors), skipped)
+            
+            # The filters window may have been closed or reopened meanwhile, update the current one
+            menu = self.editor.filters_menu
+            if menu is not None and menu.filters_window.winfo_exists():
+                menu.clear_live_preview()
+                menu.update_apply_buttons()
+        
+        # Every core, unlike decoding this is pure CPU work on pixels already in memory
+        workers = max(1, min(len(jobs), os.cpu_count() or 1))
+        batch = BackgroundBatch(self.editor.root, lambda job: func(*job), jobs, on_progress, on_finished,
+                                max_workers=workers)
+        cancel_btn = ctk.CTkButton(progress_window, text="Cancel", command=batch.cancel)
+        cancel_btn.pack(pady=10)
+        progress_window.protocol("WM_DELETE_WINDOW", batch.cancel)
+        
+        logger.debug("%s: %s images with %s workers", label, len(jobs), workers)
+        self.editor.filter_batch = batch.start()
 
-    def apply_rgb_adjustments(self, img):
-        """Apply RGB adjustments to an image"""
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-            
-        # Get current values
-        red_factor = self.red_slider.get()
-        green_factor = self.green_slider.get()
-        blue_factor = self.blue_slider.get()
-        brightness_factor = self.brightness_slider.get()
-        contrast_factor = self.contrast_slider.get()
-        
-        # Apply brightness first
-        if brightness_factor != 1.0:
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(brightness_factor)
-            
-        # Apply contrast
-        if contrast_factor != 1.0:
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(contrast_factor)
-            
-        # Apply RGB channel adjustments
-        if red_factor != 1.0 or green_factor != 1.0 or blue_factor != 1.0:
-            # Convert to numpy array
-            img_array = np.array(img)
-            
-            # Apply RGB factors
-            img_array[:, :, 0] = np.clip(img_array[:, :, 0] * red_factor, 0, 255)
-            img_array[:, :, 1] = np.clip(img_array[:, :, 1] * green_factor, 0, 255)
-            img_array[:, :, 2] = np.clip(img_array[:, :, 2] * blue_factor, 0, 255)
-            
-            img = Image.fromarray(img_array.astype(np.uint8))
-            
-        return img
+    def get_rgb_factors(self):
+        """Return the current slider values as adjust_rgb keyword arguments"""
+        return {
+            'brightness_factor': self.brightness_slider.get(),
+            'contrast_factor': self.contrast_slider.get(),
+            'red_factor': self.red_slider.get(),
+            'green_factor': self.green_slider.get(),
+            'blue_factor': self.blue_slider.get()
+        }
+        
+    def apply_rgb_adjustments(self, img, factors=None, version=None):
+        """Apply RGB adjustments to an image, using the slider values unless factors are given
+        
+        With the pixel version of img the result is cached like the standard filters.
+        """
+        factors = factors or self.get_rgb_factors()
+        return cached_filter(adjust_rgb, img, version, "rgb", tuple(factors.values()))
         
     def reset_selected_to_original(self):
         """Reset selected image to its original state"""
@@ -677,8 +859,8 @@ class FiltersMenu:
         
         # Reset to original image if available
         if 'original_image' in selected_img_data:
-            selected_img_data['image'] = selected_img_data['original_image'].copy()
-            self.editor.update_canvas()
+            self.editor.set_layer_image(selected_img_data, selected_img_data['original_image'], from_original=True)
+            self.editor.request_redraw()
             self.editor.update_status("Reset selected image to original state")
             
             # Update button states
@@ -691,19 +873,19 @@ class FiltersMenu:
         has_images = len(self.editor.images) > 0
         has_selected = self.editor.selected_image_index >= 0
         
-        print(f"DEBUG: Updating filter buttons - has_images: {has_images}, has_selected: {has_selected}")
-        print(f"DEBUG: Total images: {len(self.editor.images)}, selected_index: {self.editor.selected_image_index}")
+        logger.debug("Updating filter buttons - has_images: %s, has_selected: %s", has_images, has_selected)
+        logger.debug("Total images: %s, selected_index: %s", len(self.editor.images), self.editor.selected_image_index)
         
         try:
             current_state = "normal" if has_selected else "disabled"
             all_state = "normal" if has_images else "disabled"
             
-            print(f"DEBUG: Setting current button to: {current_state}, all button to: {all_state}")
+            logger.debug("Setting current button to: %s, all button to: %s", current_state, all_state)
             
             self.apply_current_btn.configure(state=current_state)
             self.apply_all_btn.configure(state=all_state)
             
-            print(f"DEBUG: Filter buttons updated successfully")
+            logger.debug("Filter buttons updated successfully")
             
         except Exception as e:
             print(f"Error updating filter buttons: {e}")
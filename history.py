@@ -0,0 +1,172 @@
+import itertools
+import os
+import shutil
+import tempfile
+import weakref
+import zlib
+
+from PIL import Image
+
+from image_cache import image_nbytes
+from layer import Layer
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
+
+def remove_spill_file(path):
+    """Delete a spilled image file, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SpilledImage:
+    def __init__(self, img, path):
+        """Compress the pixels of img with zlib and write them to path"""
+        self.mode = img.mode
+        self.size = img.size
+        self.palette = img.getpalette() if img.mode == "P" else None
+        self.transparency = img.info.get('transparency')
+        self.path = path
+        data = zlib.compress(img.tobytes(), 1)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.nbytes = len(data)
+        self.loaded = weakref.ref(img)  # The image stays usable while something else holds it
+        weakref.finalize(self, remove_spill_file, path)
+    
+    def load(self):
+        """Return the image, reading it back from disk if it is no longer in memory"""
+        img = self.loaded()
+        if img is None:
+            with open(self.path, 'rb') as f:
+                img = Image.frombytes(self.mode, self.size, zlib.decompress(f.read()))
+            if self.palette is not None:
+                img.putpalette(self.palette)
+            if self.transparency is not None:
+                img.info['transparency'] = self.transparency
+            self.loaded = weakref.ref(img)
+            logger.debug("Loaded spilled history image %s", self.path)
+        return img
+    
+    def is_image(self, img):
+        """Return True if img is the in-memory image this file was written from or read into"""
+        return self.loaded() is img
+
+
+# Undo records keep layer images by reference. Images are never modified in
+# place (edits go through GraphicsEditor.set_layer_image), so a record only
+# costs memory for the parameters that describe the layer.
+class LayerSnapshot:
+    __slots__ = ('uid', 'version', 'transform_version', 'image', 'original_image', 'source', 'edits',
+                 'path', 'position', 'rotation', 'visible', 'width', 'height')
+    IMAGE_FIELDS = ('image', 'original_image')
+    
+    def __init__(self, img_data):
+        for name in self.__slots__:
+            object.__setattr__(self, name, img_data.get(name))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("LayerSnapshot is immutable")
+    
+    def matches(self, img_data):
+        """Return True if the layer still has exactly the recorded parameters and pixels"""
+        for name in self.__slots__:
+            stored = getattr(self, name)
+            if name in self.IMAGE_FIELDS:
+                if isinstance(stored, SpilledImage):
+                    if not stored.is_image(img_data.get(name)):
+                        return False
+                elif stored is not img_data.get(name):
+                    return False
+            elif stored != img_data.get(name):
+                return False
+        return True
+    
+    def spill_image(self, name, spilled):
+        """Swap an in-memory image of this record for its spilled file"""
+        object.__setattr__(self, name, spilled)
+    
+    def to_layer(self):
+        """Return a fresh Layer for the editor with the recorded versions, loading spilled images back"""
+        images = {}
+        for name in self.IMAGE_FIELDS:
+            img = getattr(self, name)
+            images[name] = img.load() if isinstance(img, SpilledImage) else img
+        layer = Layer(images['image'], self.path, position=self.position, rotation=self.rotation,
+                      visible=self.visible, original_image=images['original_image'], source=self.source,
+                      edits=self.edits, uid=self.uid, version=self.version,
+                      transform_version=self.transform_version)
+        layer.width = self.width
+        layer.height = self.height
+        return layer
+
+
+def snapshot_layers(images, previous=()):
+    """Record the layer stack, reusing the previous state's records for untouched layers"""
+    previous_by_uid = {record.uid: record for record in previous}
+    records = []
+    for img_data in images:
+        record = previous_by_uid.get(img_data['uid'])
+        if record is None or not record.matches(img_data):
+            record = LayerSnapshot(img_data)
+        records.append(record)
+    return tuple(records)
+
+
+class HistorySpill:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.directory = None  # Created on first spill
+        self.file_numbers = itertools.count()
+        self.ram_bytes = 0  # Pixels held only by the history
+        self.spilled_bytes = 0  # Compressed size of history images on disk
+        self.spilled_count = 0
+    
+    def spill_path(self):
+        """Return a new file path in the spill directory"""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="graphics_editor_history_")
+            weakref.finalize(self, shutil.rmtree, self.directory, True)
+        return os.path.join(self.directory, f"{next(self.file_numbers)}.zlib")
+    
+    def enforce(self, undo_stack, redo_stack, live_images):
+        """Spill history-only images to disk, oldest first, until RAM use fits the budget"""
+        live = {id(img) for img in live_images if img is not None}
+        in_ram = {}  # id(image) -> (image, [(record, field), ...]) in spill order
+        spilled = {}
+        
+        # Furthest undo states first, then furthest redo states
+        for state in list(undo_stack) + list(redo_stack):
+            for record in state['images']:
+                for name in LayerSnapshot.IMAGE_FIELDS:
+                    img = getattr(record, name)
+                    if img is None:
+                        continue
+                    if isinstance(img, SpilledImage):
+                        spilled[id(img)] = img
+                    elif id(img) not in live:
+                        in_ram.setdefault(id(img), (img, []))[1].append((record, name))
+        
+        self.ram_bytes = sum(image_nbytes(img) for img, _ in in_ram.values())
+        for img, uses in list(in_ram.values()):
+            if self.ram_bytes <= self.budget_bytes:
+                break
+            handle = SpilledImage(img, self.spill_path())
+            for record, name in uses:
+                record.spill_image(name, handle)
+            spilled[id(handle)] = handle
+            self.ram_bytes -= image_nbytes(img)
+            logger.debug("Spilled history image %s %s to %s (%s bytes)", img.size, img.mode, handle.path, handle.nbytes)
+        
+        self.spilled_bytes = sum(handle.nbytes for handle in spilled.values())
+        self.spilled_count = len(spilled)
+    
+    def describe(self):
+        """Return a short summary of history memory for the status bar"""
+        text = f"History: {self.ram_bytes / (1024 * 1024):.1f} MB in RAM"
+        if self.spilled_count:
+            text += f", {self.spilled_bytes / (1024 * 1024):.1f} MB spilled ({self.spilled_count} images)"
+        return text
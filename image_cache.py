@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+
+def image_nbytes(img):
+    """Approximate memory used by the pixels of a PIL image"""
+    return img.width * img.height * len(img.getbands())
+
+
+class ImageLRUCache:
+    def __init__(self, max_bytes, name="cache"):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (image, size in bytes)
+        self.lock = threading.Lock()  # Filter workers share the cache with the Tk thread
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return cached image for key or None, marking it as recently used"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, img):
+        """Store image under key and evict least recently used entries over the budget"""
+        size = image_nbytes(img)
+        if size > self.max_bytes:
+            # Never cache something that would evict the whole cache
+            return
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (img, size)
+            self.current_bytes += size
+            self.evict()
+
+    def set_max_bytes(self, max_bytes):
+        """Change the memory budget, evicting least recently used entries if it shrank"""
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits its budget, call with the lock held"""
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def clear(self):
+        """Drop all cached images (statistics are kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and memory use"""
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Shared by the canvas renderer and the save functions in file_menu
+rotation_cache = ImageLRUCache(256 * 1024 * 1024, name="rotation")
+
+
+def rotate_layer_image(img, angle, version=None, resample=Image.NEAREST):
+    """Rotate a layer image with expand=True, reusing cached results for the same pixel version
+
+    The returned image may be shared with the cache and must not be modified in place.
+    """
+    if angle % 360 == 0:
+        return img
+    if version is None:
+        return img.rotate(angle, resample=resample, expand=True)
+
+    key = (version, angle, resample)
+    rotated = rotation_cache.get(key)
+    if rotated is None:
+        rotated = img.rotate(angle, resample=resample, expand=True)
+        rotation_cache.put(key, rotated)
+    return rotated
+
+
+class MipmapPyramid:
+    def __init__(self, base):
+        self.levels = [base]  # levels[i] is base downscaled by 2**i, built on demand
+        
+    def level_for(self, zoom):
+        """Return (image, scale) of the smallest level that is still at least zoom times the base size"""
+        index = 0
+        while zoom <= 0.5 ** (index + 1):
+            index += 1
+            if index == len(self.levels):
+                previous = self.levels[-1]
+                if previous.width < 2 or previous.height < 2:
+                    return previous, 0.5 ** (index - 1)
+                if previous.mode in ("1", "P", "I;16"):
+                    level = previous.resize((previous.width // 2, previous.height // 2))
+                else:
+                    level = previous.reduce(2)
+                self.levels.append(level)
+        return self.levels[index], 0.5 ** index
+        
+    def render(self, zoom):
+        """Return the whole image scaled by zoom (zoom <= 1), resampled from the nearest level"""
+        base = self.levels[0]
+        size = (max(1, round(base.width * zoom)), max(1, round(base.height * zoom)))
+        level, _ = self.level_for(zoom)
+        if level.size == size:
+            return level
+        return level.resize(size, Image.BILINEAR)
@@ -0,0 +1,59 @@
+import builtins
+import importlib
+import logging
+import sys
+import threading
+import time
+
+from debug_log import get_logger
+
+logger = get_logger("imports")
+
+# main.py imports this module first, so this is close to process start
+process_start = time.perf_counter()
+import_times = []  # (module, seconds, depth) in the order imports finished, depth 0 = imported directly
+_original_import = builtins.__import__
+_nesting = threading.local()  # Decoder threads import PIL plugins too
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """builtins.__import__ replacement that records how long each new module took"""
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    depth = getattr(_nesting, 'depth', 0)
+    _nesting.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _nesting.depth = depth
+        import_times.append((name, time.perf_counter() - start, depth))
+
+
+def install():
+    """Time every import from now on, only when the "imports" logger is at info level or lower"""
+    if logger.isEnabledFor(logging.INFO) and builtins.__import__ is _original_import:
+        builtins.__import__ = _timed_import
+
+
+def import_module(name):
+    """Import a module when it is first needed, recording how long that took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    seconds = time.perf_counter() - start
+    import_times.append((name, seconds, 0))
+    logger.info("Imported %s on first use in %.1f ms", name, seconds * 1000)
+    return module
+
+
+def report(label, min_ms=1.0, max_depth=1):
+    """Log the time since process start and the imports that cost at least min_ms"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("%s after %.1f ms", label, (time.perf_counter() - process_start) * 1000)
+    for name, seconds, depth in import_times:
+        if depth <= max_depth and seconds * 1000 >= min_ms:
+            logger.info("  %s%s: %.1f ms", "  " * depth, name, seconds * 1000)
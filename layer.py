@@ -0,0 +1,108 @@
+import itertools
+
+
+# Shared by every layer, so a version number identifies one image (or one
+# placement) across the whole document - rotation_cache keys on it alone
+_layer_uids = itertools.count(1)
+_versions = itertools.count(1)
+
+
+def next_version():
+    """Return a version number that has never been used"""
+    return next(_versions)
+
+
+class Layer:
+    __slots__ = ('uid', 'version', 'transform_version', '_image', 'original_image', 'source', 'edits',
+                 'path', '_position', '_rotation', '_visible', 'width', 'height', 'photo', 'id')
+    # Keys of the old per-layer dicts, still accepted by layer[key]
+    FIELDS = ('uid', 'version', 'transform_version', 'image', 'original_image', 'source', 'edits',
+              'path', 'position', 'rotation', 'visible', 'width', 'height', 'photo', 'id')
+    # None means the layer doesn't track it, reported as a missing key like the old dicts did
+    OPTIONAL_FIELDS = ('original_image', 'source', 'edits')
+
+    def __init__(self, image, path, position=(0, 0), rotation=0, visible=True, original_image=None,
+                 source=None, edits=None, uid=None, version=None, transform_version=None):
+        self.uid = next(_layer_uids) if uid is None else uid  # Stable id that survives undo/redo
+        self.version = next_version() if version is None else version  # Bumped when the pixels change
+        self.transform_version = next_version() if transform_version is None else transform_version  # Bumped on move, rotate, show/hide
+        self._image = image
+        self.original_image = original_image  # Pixels before resizing, for scaling functionality
+        self.source = source  # Lazily decoded full-resolution pixels
+        self.edits = edits  # Edits applied to the proxy, replayed on the source at export
+        self.path = path
+        self._position = position
+        self._rotation = rotation
+        self._visible = visible
+        self.width = image.width  # Displayed size, updated by the renderer after rotation
+        self.height = image.height
+        self.photo = None  # PhotoImage and canvas item are owned by the renderer
+        self.id = None
+
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, img):
+        self._image = img
+        self.version = next_version()
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        if position != self._position:
+            self._position = position
+            self.transform_version = next_version()
+
+    @property
+    def rotation(self):
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation):
+        if rotation != self._rotation:
+            self._rotation = rotation
+            self.transform_version = next_version()
+
+    @property
+    def visible(self):
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible):
+        if visible != self._visible:
+            self._visible = visible
+            self.transform_version = next_version()
+
+    def touch(self):
+        """Bump the pixel version after the image was modified in place"""
+        self.version = next_version()
+
+    # Dict-style access for code written against the old per-layer dicts
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        if key in self.OPTIONAL_FIELDS:
+            return getattr(self, key) is not None
+        return key in self.FIELDS
+
+    def get(self, key, default=None):
+        """Return the field, or default if the layer doesn't have it"""
+        if key not in self:
+            return default
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Layer(uid={self.uid}, path={self.path!r}, size={self.width}x{self.height}, version={self.version})"
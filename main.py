@@ -1,20 +1,40 @@
+# Start timing imports before anything heavy is loaded (see import_profile.install)
+import import_profile
+import_profile.install()
+
 import customtkinter as ctk
 import tkinter as tk
 from PIL import Image, ImageTk
+import logging
 import os
 import sys
-import numpy as np
+import math
+import time
+from contextlib import contextmanager
+
+from image_cache import rotation_cache, rotate_layer_image, MipmapPyramid
+from spatial_index import SpatialGrid, AlphaHitMask, is_opaque
+from history import snapshot_layers, HistorySpill
+from layer import Layer, next_version
+from proxy_pipeline import load_proxy, proxy_from_image, render_full_resolution
+from background_tasks import BackgroundBatch
+from debug_log import get_logger, get_timer
 
-# Import menu modules
-from file_menu import FileMenu
-from filters_menu import FiltersMenu
-from draw_menu import DrawMenu
-from text_menu import TextMenu
-from rotate_menu import RotateMenu
-from trim_menu import TrimMenu
-from ai_menu import AIMenu
-from batch_menu import BatchMenu
-from advanced_batch_menu import AdvancedBatchMenu
+logger = get_logger(__name__)
+timed = get_timer(__name__)
+
+# Menu modules are imported when their window is first opened: module -> class
+MENU_CLASSES = {
+    'file_menu': 'FileMenu',
+    'filters_menu': 'FiltersMenu',
+    'draw_menu': 'DrawMenu',
+    'text_menu': 'TextMenu',
+    'rotate_menu': 'RotateMenu',
+    'trim_menu': 'TrimMenu',
+    'ai_menu': 'AIMenu',
+    'batch_menu': 'BatchMenu',
+    'advanced_batch_menu': 'AdvancedBatchMenu',
+}
 
 class GraphicsEditor:
     def __init__(self):
@@ -30,9 +50,44 @@ class GraphicsEditor:
         # Initialize variables
         self.images = []  # Stack of loaded images
         self.current_image_index = -1
+        
+        # Incremental renderer state: layer uid -> what is currently on the canvas
+        self.rendered_layers = {}
+        self.rendered_order = []  # Layer uids in the z-order they are stacked on canvas
+        self.layer_z = {}  # Layer uid -> index in the stack, matches rendered_order
+        self.spatial_index = SpatialGrid()  # Bounding boxes of visible layers for hit-testing
+        self.pixel_accurate_picking = False  # Ignore clicks on transparent pixels of a layer
+        self.hit_masks = {}  # Layer uid -> ((version, rotation), AlphaHitMask)
+        
+        # Culling: layers outside the window (and optionally under an opaque layer) get no raster
+        self.occlusion_culling = False
+        self.layer_opacity = {}  # Layer uid -> ((version, rotation), fully opaque)
+        self.render_stats = {'passes': 0, 'rendered': 0, 'culled_offscreen': 0,
+                             'culled_occluded': 0, 'culled_hidden': 0, 'composites_built': 0}
+        
+        # Render mode: "layers" gives every layer its own canvas item, "composite" flattens the
+        # layers below and above the selected one into two cached images
+        self.render_mode = "layers"
+        self.composites = {}  # "below"/"above" -> canvas item state like rendered_layers entries
+        
+        # Coalesced redraws: all request_redraw calls of one event share a repaint
+        self.redraw_pending = None  # after_idle id of the scheduled repaint
+        self.redraw_full_rebuild = False
+        self.redraw_requests = 0
+        self.redraws_performed = 0
         self.canvas_width = 1200  # Increased canvas size
         self.canvas_height = 800
         
+        # Viewport: view = document * zoom + view_offset, in canvas widget pixels
+        self.zoom = 1.0
+        self.min_zoom = 0.05
+        self.max_zoom = 16.0
+        self.view_offset = (0.0, 0.0)
+        self.render_margin = 256  # Extra view pixels rendered around the window when zoomed in
+        self.mipmaps = {}  # Layer uid -> ((version, rotation), MipmapPyramid)
+        self.layer_previews = {}  # Layer uid -> (serial, image, version, rotation) shown instead of its pixels
+        self.pan_last = None  # Last pointer position of a middle button pan
+        
         # Create main frame
         self.main_frame = ctk.CTkFrame(self.root)
         self.main_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -49,6 +104,10 @@ class GraphicsEditor:
         # Initialize undo/redo
         self.undo_stack = []
         self.redo_stack = []
+        self.history_budget_bytes = 512 * 1024 * 1024  # Pixels kept in RAM by undo/redo before spilling to disk
+        self.history_spill = HistorySpill(self.history_budget_bytes)
+        self.transaction_depth = 0  # Nesting level of editor.transaction() blocks
+        self.transaction_skipped = 0  # save_state calls absorbed by the open transaction
         
         # Image management
         self.selected_image = None  # Currently selected image
@@ -128,6 +187,14 @@ class GraphicsEditor:
         self.canvas.bind("<B1-Motion>", self.on_canvas_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
         
+        # Viewport events: Ctrl+wheel zooms at the pointer, wheel scrolls, middle button pans
+        self.canvas.bind("<MouseWheel>", self.on_canvas_wheel)
+        self.canvas.bind("<Button-4>", self.on_canvas_wheel)
+        self.canvas.bind("<Button-5>", self.on_canvas_wheel)
+        self.canvas.bind("<ButtonPress-2>", self.start_pan)
+        self.canvas.bind("<B2-Motion>", self.continue_pan)
+        self.canvas.bind("<ButtonRelease-2>", self.stop_pan)
+        
     def create_right_panel(self):
         """Create the right panel for tools and options"""
         self.right_panel = ctk.CTkFrame(self.main_frame, width=300)
@@ -141,10 +208,45 @@ class GraphicsEditor:
         self.status_label = ctk.CTkLabel(self.right_panel, text="Ready", font=("Arial", 12))
         self.status_label.pack(pady=5)
         
+        # History memory label
+        self.history_label = ctk.CTkLabel(self.right_panel, text="History: 0.0 MB in RAM", font=("Arial", 10))
+        self.history_label.pack(pady=2)
+        
         # Image info
         self.image_info_label = ctk.CTkLabel(self.right_panel, text="No images loaded", font=("Arial", 10))
         self.image_info_label.pack(pady=5)
         
+        # Picking mode
+        self.pixel_picking_checkbox = ctk.CTkCheckBox(self.right_panel, text="Pixel-accurate picking", 
+                                                      command=self.toggle_pixel_accurate_picking)
+        self.pixel_picking_checkbox.pack(pady=5)
+        
+        # Culling mode
+        self.occlusion_culling_checkbox = ctk.CTkCheckBox(self.right_panel, text="Skip layers under opaque layers",
+                                                          command=self.toggle_occlusion_culling)
+        self.occlusion_culling_checkbox.pack(pady=5)
+        
+        # Render mode
+        self.composite_mode_checkbox = ctk.CTkCheckBox(self.right_panel, text="Flatten inactive layers",
+                                                       command=self.toggle_composite_mode)
+        self.composite_mode_checkbox.pack(pady=5)
+        
+        # Zoom controls
+        zoom_frame = ctk.CTkFrame(self.right_panel)
+        zoom_frame.pack(fill="x", pady=5)
+        
+        self.zoom_out_btn = ctk.CTkButton(zoom_frame, text="-", width=40, command=lambda: self.zoom_by(0.5))
+        self.zoom_out_btn.pack(side="left", padx=5, pady=5)
+        
+        self.zoom_label = ctk.CTkLabel(zoom_frame, text="100%", width=60)
+        self.zoom_label.pack(side="left", padx=5)
+        
+        self.zoom_in_btn = ctk.CTkButton(zoom_frame, text="+", width=40, command=lambda: self.zoom_by(2.0))
+        self.zoom_in_btn.pack(side="left", padx=5, pady=5)
+        
+        self.zoom_reset_btn = ctk.CTkButton(zoom_frame, text="1:1", width=50, command=self.reset_view)
+        self.zoom_reset_btn.pack(side="left", padx=5, pady=5)
+        
         # Tools section (will be populated by menu modules)
         self.tools_frame = ctk.CTkFrame(self.right_panel)
         self.tools_frame.pack(fill="x", pady=10)
@@ -154,6 +256,7 @@ class GraphicsEditor:
         # Don't initialize menus immediately - only when needed
         self.file_menu = None
         self.filters_menu = None
+        self.filter_batch = None  # Running apply-to-all of the filters menu, outlives the menu window
         self.draw_menu = None
         self.text_menu = None
         self.rotate_menu = None
@@ -162,6 +265,10 @@ class GraphicsEditor:
         self.batch_menu = None
         self.advanced_batch_menu = None
 
+    def menu_class(self, module_name):
+        """Return the class of a menu, importing its module on first use"""
+        return getattr(import_profile.import_module(module_name), MENU_CLASSES[module_name])
+        
     def show_file_menu(self):
         """Show file menu options"""
         # Always create new menu window
@@ -170,17 +277,17 @@ class GraphicsEditor:
                 self.file_menu.file_window.destroy()
         except:
             pass
-        self.file_menu = FileMenu(self)
+        self.file_menu = self.menu_class("file_menu")(self)
         
     def show_filters_menu(self):
         """Show filters menu options"""
         # Always create new menu window
         try:
             if self.filters_menu is not None:
-                self.filters_menu.filters_window.destroy()
+                self.filters_menu.close_window()
         except:
             pass
-        self.filters_menu = FiltersMenu(self)
+        self.filters_menu = self.menu_class("filters_menu")(self)
         
     def show_draw_menu(self):
         """Show draw menu options"""
@@ -190,7 +297,7 @@ class GraphicsEditor:
                 self.draw_menu.draw_window.destroy()
         except:
             pass
-        self.draw_menu = DrawMenu(self)
+        self.draw_menu = self.menu_class("draw_menu")(self)
         
     def show_text_menu(self):
         """Show text menu options"""
@@ -200,7 +307,7 @@ class GraphicsEditor:
                 self.text_menu.text_window.destroy()
         except:
             pass
-        self.text_menu = TextMenu(self)
+        self.text_menu = self.menu_class("text_menu")(self)
         
     def show_rotate_menu(self):
         """Show rotate menu options"""
@@ -210,7 +317,7 @@ class GraphicsEditor:
                 self.rotate_menu.rotate_window.destroy()
         except:
             pass
-        self.rotate_menu = RotateMenu(self)
+        self.rotate_menu = self.menu_class("rotate_menu")(self)
         
     def show_trim_menu(self):
         """Show trim menu options"""
@@ -220,7 +327,7 @@ class GraphicsEditor:
                 self.trim_menu.trim_window.destroy()
         except:
             pass
-        self.trim_menu = TrimMenu(self)
+        self.trim_menu = self.menu_class("trim_menu")(self)
         
     def show_ai_menu(self):
         """Show AI menu options"""
@@ -230,7 +337,7 @@ class GraphicsEditor:
                 self.ai_menu.ai_window.destroy()
         except:
             pass
-        self.ai_menu = AIMenu(self)
+        self.ai_menu = self.menu_class("ai_menu")(self)
 
     def show_batch_menu(self):
         """Show batch processing menu options"""
@@ -240,7 +347,7 @@ class GraphicsEditor:
                 self.batch_menu.batch_window.destroy()
         except:
             pass
-        self.batch_menu = BatchMenu(self)
+        self.batch_menu = self.menu_class("batch_menu")(self)
 
     def show_advanced_batch_menu(self):
         """Show advanced batch processing menu options"""
@@ -250,7 +357,7 @@ class GraphicsEditor:
                 self.advanced_batch_menu.advanced_batch_window.destroy()
         except:
             pass
-        self.advanced_batch_menu = AdvancedBatchMenu(self)
+        self.advanced_batch_menu = self.menu_class("advanced_batch_menu")(self)
 
     def clear_tools_panel(self):
         """Clear the tools panel"""
@@ -259,29 +366,29 @@ class GraphicsEditor:
 
     def on_canvas_click(self, event):
         """Handle canvas click events"""
-        x, y = event.x, event.y
-        print(f"DEBUG: on_canvas_click called at ({x}, {y})")
-        print(f"DEBUG: Total images: {len(self.images)}")
+        x, y = (round(v) for v in self.view_to_doc(event.x, event.y))
+        logger.debug("on_canvas_click called at (%s, %s)", x, y)
+        logger.debug("Total images: %s", len(self.images))
         
         # Check if any menu mode is active
         if self.draw_menu and (self.draw_menu.is_drawing_active or self.draw_menu.is_drawing_shapes):
-            print(f"DEBUG: Draw menu active, calling start_drawing")
+            logger.debug("Draw menu active, calling start_drawing")
             self.draw_menu.start_drawing(x, y)
         elif self.text_menu and hasattr(self.text_menu, 'is_adding_text') and self.text_menu.is_adding_text:
-            print(f"DEBUG: Text menu active, calling add_text_at_position")
+            logger.debug("Text menu active, calling add_text_at_position")
             self.text_menu.add_text_at_position(x, y)
         elif self.rotate_menu and hasattr(self.rotate_menu, 'is_rotating') and self.rotate_menu.is_rotating:
-            print(f"DEBUG: Rotate menu active, calling start_mouse_rotation")
+            logger.debug("Rotate menu active, calling start_mouse_rotation")
             self.rotate_menu.start_mouse_rotation(x, y)
         elif self.trim_menu and hasattr(self.trim_menu, 'is_cropping') and self.trim_menu.is_cropping:
-            print(f"DEBUG: Trim menu active, calling start_crop_selection")
+            logger.debug("Trim menu active, calling start_crop_selection")
             self.trim_menu.start_crop_selection(x, y)
         else:
-            print(f"DEBUG: No menu mode active, selecting image")
+            logger.debug("No menu mode active, selecting image")
             # Default behavior: select image
             self.select_image_at_position(x, y)
             
-            print(f"DEBUG: After select_image_at_position - selected_index: {self.selected_image_index}, selected_image: {self.selected_image is not None}")
+            logger.debug("After select_image_at_position - selected_index: %s, selected_image: %s", self.selected_image_index, self.selected_image is not None)
             
             # Now check if we actually selected an image and if click is on it
             if self.selected_image_index >= 0 and self.selected_image:
@@ -291,40 +398,41 @@ class GraphicsEditor:
                 img_width = self.selected_image['width']
                 img_height = self.selected_image['height']
                 
-                print(f"DEBUG: Image bounds - x: [{img_x}, {img_x + img_width}], y: [{img_y}, {img_y + img_height}]")
-                print(f"DEBUG: Click at ({x}, {y}) - checking if within bounds")
+                logger.debug("Image bounds - x: [%s, %s], y: [%s, %s]", img_x, img_x + img_width, img_y, img_y + img_height)
+                logger.debug("Click at (%s, %s) - checking if within bounds", x, y)
                 
                 if (img_x <= x <= img_x + img_width and 
                     img_y <= y <= img_y + img_height):
-                    print(f"DEBUG: Click is on image, starting drag")
+                    logger.debug("Click is on image, starting drag")
                     self.start_image_drag(x, y)
                 else:
-                    print(f"DEBUG: Click is not on image, not starting drag")
+                    logger.debug("Click is not on image, not starting drag")
             else:
-                print(f"DEBUG: No image selected, cannot start drag")
+                logger.debug("No image selected, cannot start drag")
 
     def on_canvas_drag(self, event):
         """Handle canvas drag events"""
-        x, y = event.x, event.y
-        print(f"DEBUG: on_canvas_drag called at ({x}, {y})")
-        print(f"DEBUG: is_dragging: {self.is_dragging}, selected_image: {self.selected_image is not None}")
+        x, y = (round(v) for v in self.view_to_doc(event.x, event.y))
+        logger.debug("on_canvas_drag called at (%s, %s)", x, y)
+        logger.debug("is_dragging: %s, selected_image: %s", self.is_dragging, self.selected_image is not None)
         
-        # Check if any menu mode is active
-        if self.draw_menu and (self.draw_menu.is_drawing_active or self.draw_menu.is_drawing_shapes):
-            print(f"DEBUG: Draw menu active, calling continue_drawing")
-            self.draw_menu.continue_drawing(x, y)
-        elif self.rotate_menu and hasattr(self.rotate_menu, 'is_rotating') and self.rotate_menu.is_rotating:
-            print(f"DEBUG: Rotate menu active, calling continue_mouse_rotation")
-            self.rotate_menu.continue_mouse_rotation(x, y)
-        elif self.trim_menu and hasattr(self.trim_menu, 'is_cropping') and self.trim_menu.is_cropping:
-            print(f"DEBUG: Trim menu active, calling continue_crop_selection")
-            self.trim_menu.continue_crop_selection(x, y)
-        elif self.is_dragging and self.selected_image:
-            print(f"DEBUG: Image dragging active, calling continue_image_drag")
-            # Continue dragging selected image
-            self.continue_image_drag(x, y)
-        else:
-            print(f"DEBUG: No active mode, is_dragging: {self.is_dragging}, selected_image: {self.selected_image is not None}")
+        with timed("Canvas drag"):
+            # Check if any menu mode is active
+            if self.draw_menu and (self.draw_menu.is_drawing_active or self.draw_menu.is_drawing_shapes):
+                logger.debug("Draw menu active, calling continue_drawing")
+                self.draw_menu.continue_drawing(x, y)
+            elif self.rotate_menu and hasattr(self.rotate_menu, 'is_rotating') and self.rotate_menu.is_rotating:
+                logger.debug("Rotate menu active, calling continue_mouse_rotation")
+                self.rotate_menu.continue_mouse_rotation(x, y)
+            elif self.trim_menu and hasattr(self.trim_menu, 'is_cropping') and self.trim_menu.is_cropping:
+                logger.debug("Trim menu active, calling continue_crop_selection")
+                self.trim_menu.continue_crop_selection(x, y)
+            elif self.is_dragging and self.selected_image:
+                logger.debug("Image dragging active, calling continue_image_drag")
+                # Continue dragging selected image
+                self.continue_image_drag(x, y)
+            else:
+                logger.debug("No active mode, is_dragging: %s, selected_image: %s", self.is_dragging, self.selected_image is not None)
 
     def on_canvas_release(self, event):
         """Handle canvas release events"""
@@ -337,53 +445,86 @@ class GraphicsEditor:
             # Stop dragging selected image
             self.stop_image_drag()
 
-    def add_image(self, image_path):
-        """Add a new image to the stack"""
+    def load_image_proxy(self, image_path):
+        """Decode a file into (display proxy, full-resolution source), safe to call from worker threads"""
+        return load_proxy(image_path, (self.canvas_width, self.canvas_height))
+        
+    def image_proxy(self, img):
+        """Return (display proxy, in-memory source) for pixels that don't come from a file"""
+        return proxy_from_image(img, (self.canvas_width, self.canvas_height))
+        
+    def import_images(self, image_paths, label, on_done=None):
+        """Decode files in a thread pool with a progress window, then add them as one undo entry"""
+        image_paths = list(image_paths)
+        
+        progress_window = ctk.CTkToplevel(self.root)
+        progress_window.title(label)
+        progress_window.geometry("360x130")
+        progress_window.resizable(False, False)
+        progress_window.transient(self.root)
+        
+        progress_label = ctk.CTkLabel(progress_window, text=f"Loading 0 of {len(image_paths)} images...")
+        progress_label.pack(pady=(15, 5))
+        progress_bar = ctk.CTkProgressBar(progress_window)
+        progress_bar.pack(fill="x", padx=20, pady=5)
+        progress_bar.set(0)
+        
+        def on_progress(completed, total):
+            progress_label.configure(text=f"Loading {completed} of {total} images...")
+            progress_bar.set(completed / total if total else 1)
+            
+        def on_finished(results, errors, cancelled):
+            progress_window.destroy()
+            for path, error in errors:
+                logger.warning("Error loading image %s: %s", path, error)
+            
+            if cancelled:
+                self.update_status(f"{label} cancelled")
+                loaded_count = 0
+            else:
+                # All layers go in as one history entry, the redraw requests coalesce into one repaint
+                with self.transaction(label):
+                    for path, loaded in zip(image_paths, results):
+                        if loaded is not None:
+                            self.add_image(path, loaded)
+                loaded_count = sum(1 for loaded in results if loaded is not None)
+                self.update_status(f"{label}: {loaded_count} images loaded" + 
+                                   (f", {len(errors)} failed" if errors else ""))
+            
+            logger.debug("Import finished - loaded: %s, errors: %s, cancelled: %s", loaded_count, len(errors), cancelled)
+            if on_done:
+                on_done(loaded_count, cancelled)
+        
+        batch = BackgroundBatch(self.root, self.load_image_proxy, image_paths, on_progress, on_finished)
+        cancel_btn = ctk.CTkButton(progress_window, text="Cancel", command=batch.cancel)
+        cancel_btn.pack(pady=10)
+        progress_window.protocol("WM_DELETE_WINDOW", batch.cancel)
+        
+        logger.debug("Importing %s images with %s workers", len(image_paths), batch.max_workers)
+        return batch.start()
+        
+    def add_image(self, image_path, loaded=None):
+        """Add a new image to the stack, loaded is an already decoded (proxy, source) pair"""
         try:
-            print(f"DEBUG: Adding image: {image_path}")
-            
-            # Load image
-            img = Image.open(image_path)
-            print(f"DEBUG: Image loaded: mode={img.mode}, size={img.size}")
-            
-            # Scale image to fit canvas if too large
-            try:
-                img.thumbnail((self.canvas_width, self.canvas_height), Image.Resampling.LANCZOS)
-            except AttributeError:
-                # Fallback for older Pillow versions
-                img.thumbnail((self.canvas_width, self.canvas_height), Image.LANCZOS)
-            
-            print(f"DEBUG: After thumbnail: size={img.size}")
+            logger.debug("Adding image: %s", image_path)
             
-            # Convert to PhotoImage for tkinter
-            photo = ImageTk.PhotoImage(img)
+            # Load a display proxy that fits the canvas, full resolution stays in the file until export
+            img, source = loaded or self.load_image_proxy(image_path)
+            logger.debug("Image loaded: mode=%s, source size=%s, proxy size=%s", img.mode, source.size, img.size)
             
             # Calculate position to center image on canvas
             x = (self.canvas_width - img.width) // 2
             y = (self.canvas_height - img.height) // 2
             
-            print(f"DEBUG: Image position: ({x}, {y})")
-            
-            # Add to images stack
-            image_id = self.canvas.create_image(x, y, anchor="nw", image=photo)
+            logger.debug("Image position: (%s, %s)", x, y)
             
-            image_data = {
-                'image': img,
-                'original_image': img.copy(),  # Store original for scaling functionality
-                'photo': photo,
-                'path': image_path,
-                'position': (x, y),
-                'rotation': 0,
-                'visible': True,
-                'id': image_id,
-                'width': img.width,
-                'height': img.height
-            }
+            # Canvas item and PhotoImage are created by update_canvas
+            image_data = Layer(img, image_path, position=(x, y), original_image=img, source=source, edits=())
             
-            print(f"DEBUG: Image data created - width: {img.width}, height: {img.height}, position: ({x}, {y})")
+            logger.debug("Image data created - width: %s, height: %s, position: (%s, %s)", img.width, img.height, x, y)
             
             self.images.append(image_data)
-            print(f"DEBUG: Image added to stack at index {len(self.images) - 1}")
+            logger.debug("Image added to stack at index %s", len(self.images) - 1)
             
 
             self.current_image_index = len(self.images) - 1
@@ -397,9 +538,9 @@ class GraphicsEditor:
                     'selected_image_index': -1
                 }
                 self.undo_stack.append(initial_state)
-                print("DEBUG: Initial state saved")
+                logger.debug("Initial state saved")
             
-            self.update_canvas()
+            self.request_redraw()
             self.update_status(f"Loaded: {os.path.basename(image_path)}")
             self.update_image_info()
             
@@ -414,199 +555,702 @@ class GraphicsEditor:
             # Save state for undo/redo
             self.save_state()
             
-            print(f"DEBUG: Image loading completed successfully")
+            logger.debug("Image loading completed successfully")
             
         except Exception as e:
-            print(f"DEBUG: Error loading image: {e}")
+            logger.warning("Error loading image: %s", e)
             import traceback
             traceback.print_exc()
             self.update_status(f"Error loading image: {str(e)}")
             
-    def update_canvas(self):
-        """Update the canvas with current images"""
-        print(f"DEBUG: Updating canvas with {len(self.images)} images")
+    def request_redraw(self, full_rebuild=False):
+        """Schedule one canvas update for the next Tk idle cycle, merging repeated requests"""
+        self.redraw_requests += 1
+        self.redraw_full_rebuild = self.redraw_full_rebuild or full_rebuild
+        if self.redraw_pending is None:
+            self.redraw_pending = self.root.after_idle(self.perform_redraw)
+            
+    def perform_redraw(self):
+        """Run the repaint scheduled by request_redraw"""
+        self.redraw_pending = None
+        self.redraws_performed += 1
+        logger.debug("Coalesced redraw - %s requests, %s repaints saved so far", self.redraw_requests, self.redraws_saved)
+        with timed("Redraw"):
+            self.update_canvas()
+        
+    @property
+    def redraws_saved(self):
+        """Number of repaints avoided by coalescing redraw requests"""
+        return self.redraw_requests - self.redraws_performed
+        
+    def update_canvas(self, full_rebuild=False):
+        """Update the canvas with current images
+        
+        Only layers whose pixels, position, rotation, visibility or stacking
+        order changed since the last call are touched. Pass full_rebuild=True
+        to clear the canvas and recreate every item from scratch.
+        """
+        logger.debug("Updating canvas with %s images (full_rebuild=%s)", len(self.images), full_rebuild)
+        
+        # A direct update also serves any repaint that is still scheduled
+        if self.redraw_pending is not None:
+            self.root.after_cancel(self.redraw_pending)
+            self.redraw_pending = None
+            self.redraws_performed += 1
+        if self.redraw_full_rebuild:
+            full_rebuild = True
+            self.redraw_full_rebuild = False
         
-        # Store current highlight info
-        current_highlight = None
+        # Remove highlight, it is recreated for the selected image below
         if self.highlight_rect:
-            current_highlight = self.canvas.coords(self.highlight_rect)
             self.canvas.delete(self.highlight_rect)
             self.highlight_rect = None
-            print(f"DEBUG: Stored highlight coordinates: {current_highlight}")
         
-        # Clear canvas and recreate all images to ensure proper layering
-        self.canvas.delete("all")
+        if full_rebuild:
+            self.canvas.delete("all")
+            self.rendered_layers = {}
+            self.rendered_order = []
+            self.layer_z = {}
+            self.spatial_index.clear()
+            self.hit_masks = {}
+            self.mipmaps = {}
+            self.layer_opacity = {}
+            self.composites = {}
         
-        for i, img_data in enumerate(self.images):
-            if img_data['visible']:
-                print(f"DEBUG: Processing image {i}: pos={img_data['position']}, size=({img_data['width']}, {img_data['height']})")
-                
-                # Apply rotation if needed
-                img = img_data['image']
-                if img_data['rotation'] != 0:
-                    try:
-                        img = img.rotate(img_data['rotation'], expand=True)
-                        print(f"DEBUG: Applied rotation {img_data['rotation']}° to image {i}")
-                    except TypeError:
-                        # Fallback for older Pillow versions
-                        img = img.rotate(img_data['rotation'], expand=True)
-                
-                # Convert to PhotoImage
-                photo = ImageTk.PhotoImage(img)
-                img_data['photo'] = photo  # Keep reference
-                
-                # Create new image on canvas
-                x, y = img_data['position']
-                image_id = self.canvas.create_image(x, y, anchor="nw", image=photo, tags=f"image_{i}")
-                img_data['id'] = image_id
-                
-                # Update width and height if they changed
-                img_data['width'] = img.width
-                img_data['height'] = img.height
-                
-                print(f"DEBUG: Created image {i} on canvas at ({x}, {y}) with ID {image_id}")
+        # Drop canvas items of layers that are no longer in the stack
+        current_uids = set(img_data['uid'] for img_data in self.images)
+        for uid in list(self.rendered_layers):
+            if uid not in current_uids:
+                self.canvas.delete(self.rendered_layers.pop(uid)['item'])
+                self.spatial_index.remove(uid)
+                self.hit_masks.pop(uid, None)
+                self.mipmaps.pop(uid, None)
+                self.layer_opacity.pop(uid, None)
+                self.layer_previews.pop(uid, None)
         
-        # Restore drawings if draw menu exists and has drawings
-        if hasattr(self, 'draw_menu') and self.draw_menu and hasattr(self.draw_menu, 'drawing_elements'):
-            print(f"DEBUG: Restoring {len(self.draw_menu.drawing_elements)} drawing elements")
-            self.draw_menu.redraw_all_drawings()
+        culled = self.find_culled_layers()
+        if self.render_mode == "composite":
+            self.update_composites(culled)
+        else:
+            created = False
+            for i, img_data in enumerate(self.images):
+                if self.render_layer(i, img_data, img_data['uid'] in culled):
+                    created = True
+            
+            # Restack only when the z-order changed or new items were added on top
+            order = [img_data['uid'] for img_data in self.images]
+            if created or order != self.rendered_order:
+                self.restack_layers()
         
-        # Restore text if text menu exists and has text
-        if hasattr(self, 'text_menu') and self.text_menu and hasattr(self.text_menu, 'text_elements'):
-            print(f"DEBUG: Restoring {len(self.text_menu.text_elements)} text elements")
-            self.text_menu.redraw_all_text()
+        if full_rebuild:
+            # Restore drawings if draw menu exists and has drawings
+            if hasattr(self, 'draw_menu') and self.draw_menu and hasattr(self.draw_menu, 'drawing_elements'):
+                logger.debug("Restoring %s drawing elements", len(self.draw_menu.drawing_elements))
+                self.draw_menu.redraw_all_drawings()
+            
+            # Restore text if text menu exists and has text
+            if hasattr(self, 'text_menu') and self.text_menu and hasattr(self.text_menu, 'text_elements'):
+                logger.debug("Restoring %s text elements", len(self.text_menu.text_elements))
+                self.text_menu.redraw_all_text()
         
         # Restore highlight if image is selected
         if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
             self.selected_image = self.images[self.selected_image_index]
             self.highlight_selected_image()
-            print(f"DEBUG: Restored highlight for selected image {self.selected_image_index}")
+            logger.debug("Restored highlight for selected image %s", self.selected_image_index)
         else:
-            print(f"DEBUG: No highlight restored - selected_index: {self.selected_image_index}, total_images: {len(self.images)}")
+            logger.debug("No highlight restored - selected_index: %s, total_images: %s", self.selected_image_index, len(self.images))
+            
+    def render_layer(self, index, img_data, culled=False):
+        """Bring the canvas item of one layer in sync with its data, returns True if a new item was created"""
+        img = self.layer_display_image(img_data)
+        self.update_layer_bounds(img_data)
+        
+        state = self.rendered_layers.get(img_data['uid'])
+        if culled:
+            # Nothing to show - hide the item and leave its raster stale until the layer is back in view
+            if state is not None and state['visible']:
+                self.canvas.itemconfigure(state['item'], state="hidden")
+                state['visible'] = False
+            return False
+        created = state is None
+        
+        if created:
+            state = {'item': None, 'photo': None, 'photo_format': None, 'key': None,
+                     'region': None, 'view_position': None, 'visible': None}
+            self.rendered_layers[img_data['uid']] = state
+        
+        preview = self.layer_previews.get(img_data['uid'])
+        if preview is not None and preview[2:] != (img_data['version'], img_data['rotation']):
+            # The layer changed since the preview was made
+            del self.layer_previews[img_data['uid']]
+            preview = None
+        
+        # Pixels, rotation, zoom, preview or the rendered part of the layer changed - rebuild the raster
+        region = self.layer_render_region(img_data, state)
+        key = (img_data['version'], img_data['rotation'], self.zoom, region, preview[0] if preview else None)
+        if state['key'] != key:
+            if preview is not None:
+                raster = self.render_preview_raster(img_data, preview[1], region)
+            else:
+                raster = self.render_layer_raster(img_data, img, region)
+            
+            photo = state['photo']
+            if photo is not None and state['photo_format'] == (raster.mode, raster.size):
+                # Same size and mode - update the existing PhotoImage in place
+                photo.paste(raster)
+                logger.debug("Pasted new pixels of image %s into existing PhotoImage", index)
+            else:
+                photo = ImageTk.PhotoImage(raster)
+                state['photo'] = photo  # Keep reference
+                state['photo_format'] = (raster.mode, raster.size)
+                if not created:
+                    self.canvas.itemconfigure(state['item'], image=photo)
+                logger.debug("Created new PhotoImage for image %s at zoom %.3f", index, self.zoom)
+            state['key'] = key
+            state['region'] = region
+            
+            if created:
+                state['item'] = self.canvas.create_image(0, 0, anchor="nw", image=photo, tags="layer")
+                logger.debug("Created image %s on canvas with ID %s", index, state['item'])
+        
+        img_data['photo'] = state['photo']
+        img_data['id'] = state['item']
+        
+        # Place the raster at the view position of its region
+        x, y = img_data['position']
+        if region is not None:
+            x += region[0]
+            y += region[1]
+        view_position = self.doc_to_view(x, y)
+        if state['view_position'] != view_position:
+            self.canvas.coords(state['item'], *view_position)
+            state['view_position'] = view_position
+        
+        if state['visible'] != img_data['visible']:
+            self.canvas.itemconfigure(state['item'], state="normal" if img_data['visible'] else "hidden")
+            state['visible'] = img_data['visible']
+        
+        return created
+        
+    def layer_display_image(self, img_data):
+        """Return the full size raster of a layer in document pixels (rotation applied) and sync its size"""
+        img = img_data['image']
+        if img_data['rotation'] != 0:
+            img = rotate_layer_image(img, img_data['rotation'], img_data['version'])
+            if logger.isEnabledFor(logging.DEBUG):  # stats() builds a dict, skip it on every render pass
+                logger.debug("Applied rotation %s° to layer %s - cache: %s", img_data['rotation'], img_data['uid'],
+                             rotation_cache.stats())
+        img_data['width'] = img.width
+        img_data['height'] = img.height
+        return img
+        
+    def find_culled_layers(self):
+        """Return uids of layers that need no raster this pass
+        
+        Hidden layers and layers outside the window are always culled. With
+        occlusion culling on, so are layers whose visible part lies entirely
+        inside a fully opaque layer above them.
+        """
+        view_x1, view_y1, view_x2, view_y2 = self.visible_doc_rect()
+        culled = set()
+        counts = {'culled_offscreen': 0, 'culled_occluded': 0, 'culled_hidden': 0}
+        occluders = []  # Visible bounds of opaque layers above the current one
+        
+        for img_data in reversed(self.images):
+            if not img_data['visible']:
+                culled.add(img_data['uid'])
+                counts['culled_hidden'] += 1
+                continue
+            
+            self.layer_display_image(img_data)
+            x, y = img_data['position']
+            x1, y1 = max(x, view_x1), max(y, view_y1)
+            x2, y2 = min(x + img_data['width'], view_x2), min(y + img_data['height'], view_y2)
+            if x1 >= x2 or y1 >= y2:
+                culled.add(img_data['uid'])
+                counts['culled_offscreen'] += 1
+                continue
+            
+            if self.occlusion_culling:
+                if any(ox1 <= x1 and oy1 <= y1 and x2 <= ox2 and y2 <= oy2 for ox1, oy1, ox2, oy2 in occluders):
+                    culled.add(img_data['uid'])
+                    counts['culled_occluded'] += 1
+                    continue
+                if self.layer_is_opaque(img_data):
+                    occluders.append((x1, y1, x2, y2))
+        
+        rendered = len(self.images) - len(culled)
+        self.render_stats['passes'] += 1
+        self.render_stats['rendered'] += rendered
+        for name, count in counts.items():
+            self.render_stats[name] += count
+        logger.debug("Render pass - %s layers rendered, %s off screen, %s occluded, %s hidden",
+                     rendered, counts['culled_offscreen'], counts['culled_occluded'], counts['culled_hidden'])
+        return culled
+        
+    def layer_is_opaque(self, img_data):
+        """Return True if the displayed layer has no transparent pixels, cached per pixel version and rotation"""
+        key = (img_data['version'], img_data['rotation'])
+        cached = self.layer_opacity.get(img_data['uid'])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        opaque = is_opaque(self.layer_display_image(img_data))
+        self.layer_opacity[img_data['uid']] = (key, opaque)
+        return opaque
+        
+    def toggle_occlusion_culling(self):
+        """Switch skipping of layers covered by opaque layers"""
+        self.occlusion_culling = bool(self.occlusion_culling_checkbox.get())
+        if not self.occlusion_culling:
+            self.layer_opacity = {}
+        self.request_redraw()
+        
+    def render_layer_raster(self, img_data, img, region):
+        """Return the pixels shown for a layer at the current zoom
+        
+        When zoomed out the nearest mipmap level is resampled to the exact size.
+        When zoomed in only region (layer pixels around the window) is enlarged.
+        """
+        if region is not None:
+            x1, y1, x2, y2 = region
+            size = (max(1, round((x2 - x1) * self.zoom)), max(1, round((y2 - y1) * self.zoom)))
+            return img.crop(region).resize(size, Image.NEAREST)
+        if self.zoom == 1:
+            return img
+        return self.layer_pyramid(img_data, img).render(self.zoom)
+        
+    def render_preview_raster(self, img_data, preview, region):
+        """Return the pixels shown for a layer preview (any scale of the displayed layer) at the current zoom"""
+        box = region or (0, 0, img_data['width'], img_data['height'])
+        size = (max(1, round((box[2] - box[0]) * self.zoom)), max(1, round((box[3] - box[1]) * self.zoom)))
+        scale_x = preview.width / img_data['width']
+        scale_y = preview.height / img_data['height']
+        box = (box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y)
+        if size == preview.size and box == (0, 0, preview.width, preview.height):
+            return preview
+        return preview.resize(size, Image.NEAREST if size[0] > box[2] - box[0] else Image.BILINEAR, box=box)
+        
+    def preview_scale(self):
+        """Return the scale at which a layer preview covers the screen pixels of the layer"""
+        return min(1.0, self.zoom)
+        
+    def set_layer_preview(self, img_data, preview):
+        """Show preview instead of the layer's pixels, repainting only that layer
+        
+        preview is the unrotated layer at any scale, preview_scale() is enough
+        for the current zoom. It is dropped when the layer's pixels or rotation
+        change. Pass None to show the layer's own pixels again.
+        """
+        uid = img_data['uid']
+        if preview is None:
+            if self.layer_previews.pop(uid, None) is None:
+                return
+        else:
+            if img_data['rotation'] != 0:
+                preview = preview.rotate(img_data['rotation'], resample=Image.NEAREST, expand=True)
+            self.layer_previews[uid] = (next_version(), preview, img_data['version'], img_data['rotation'])
+        
+        if uid in self.rendered_layers and uid in self.layer_z:
+            self.render_layer(self.layer_z[uid], img_data)
+        else:
+            self.request_redraw()
+        
+    def layer_pyramid(self, img_data, img):
+        """Return the mipmap pyramid of a layer's displayed raster, rebuilt when its pixels or rotation change"""
+        key = (img_data['version'], img_data['rotation'])
+        cached = self.mipmaps.get(img_data['uid'])
+        if cached is None or cached[0] != key:
+            cached = (key, MipmapPyramid(img))
+            self.mipmaps[img_data['uid']] = cached
+        return cached[1]
+        
+    def layer_render_region(self, img_data, state):
+        """Return the (x1, y1, x2, y2) part of the layer to render when zoomed in, None for the whole layer"""
+        if self.zoom <= 1:
+            return None
+        
+        # Layer pixels inside the window
+        x, y = img_data['position']
+        view_x1, view_y1, view_x2, view_y2 = self.visible_doc_rect()
+        needed = (max(0, int(view_x1 - x)), max(0, int(view_y1 - y)),
+                  min(img_data['width'], int(view_x2 - x) + 1), min(img_data['height'], int(view_y2 - y) + 1))
+        if needed[0] >= needed[2] or needed[1] >= needed[3]:
+            # Off screen, keep whatever was rendered or a single pixel
+            if state['region'] is not None and state['key'] is not None and state['key'][2] == self.zoom:
+                return state['region']
+            return (0, 0, 1, 1)
+        
+        # Keep the current raster while it still covers the window, avoids re-rendering on small pans
+        current = state['region']
+        if (current is not None and state['key'] is not None and state['key'][:3] ==
+                (img_data['version'], img_data['rotation'], self.zoom) and
+                current[0] <= needed[0] and current[1] <= needed[1] and
+                current[2] >= needed[2] and current[3] >= needed[3]):
+            return current
+        
+        margin = int(self.render_margin / self.zoom)
+        return (max(0, needed[0] - margin), max(0, needed[1] - margin),
+                min(img_data['width'], needed[2] + margin), min(img_data['height'], needed[3] + margin))
+        
+    def update_layer_bounds(self, img_data):
+        """Keep the spatial index entry of a layer in sync with its position and size"""
+        if img_data['visible']:
+            x, y = img_data['position']
+            self.spatial_index.update(img_data['uid'], x, y, x + img_data['width'], y + img_data['height'])
+        else:
+            self.spatial_index.remove(img_data['uid'])
+        
+    def set_layer_image(self, img_data, img, edit=None, from_original=False):
+        """Replace the pixels of a layer (assigning the image bumps its pixel version)"""
+        img_data['image'] = img
+        
+        # edit is the (function, params) that produced img and is replayed on the full-resolution
+        # source at export. from_original means img was derived from 'original_image' instead of
+        # the current pixels. Without an edit the layer can only be exported from its proxy.
+        if from_original:
+            img_data['edits'] = (edit,) if edit is not None else ()
+        elif edit is None:
+            img_data['edits'] = None
+        elif img_data.get('edits') is not None:
+            img_data['edits'] = img_data['edits'] + (edit,)
+        
+    def get_full_resolution_image(self, img_data):
+        """Return the layer pixels at source resolution with all its edits replayed"""
+        return render_full_resolution(img_data)
+        
+    def update_composites(self, culled):
+        """Composite render mode: only the selected layer is a live canvas item
+        
+        The layers below and above it are flattened into one image each, cached
+        until the zoom, the window region or any of their layers changes.
+        """
+        active = self.selected_image_index if 0 <= self.selected_image_index < len(self.images) else len(self.images)
+        active_uid = self.images[active]['uid'] if active < len(self.images) else None
+        
+        # Drop the live items of layers that are no longer active
+        for uid in list(self.rendered_layers):
+            if uid != active_uid:
+                self.canvas.delete(self.rendered_layers.pop(uid)['item'])
+        
+        for i, img_data in enumerate(self.images):
+            if i == active:
+                self.render_layer(i, img_data, img_data['uid'] in culled)
+            else:
+                self.layer_display_image(img_data)
+                self.update_layer_bounds(img_data)
+        
+        below = self.render_composite("below", [img_data for img_data in self.images[:active]
+                                                if img_data['uid'] not in culled])
+        above = self.render_composite("above", [img_data for img_data in self.images[active + 1:]
+                                                if img_data['uid'] not in culled])
+        
+        # Below composite, active layer, above composite - all under drawings, text and highlight
+        active_state = self.rendered_layers.get(active_uid)
+        for item in (above, active_state['item'] if active_state else None, below):
+            if item is not None:
+                self.canvas.tag_lower(item)
+        self.rendered_order = [img_data['uid'] for img_data in self.images]
+        self.layer_z = {uid: i for i, uid in enumerate(self.rendered_order)}
+        
+    def render_composite(self, name, layers):
+        """Show layers flattened into one canvas image, returns its item or None if there is nothing to show"""
+        state = self.composites.get(name)
+        if not layers:
+            if state is not None:
+                self.canvas.delete(state['item'])
+                del self.composites[name]
+            return None
+        if state is None:
+            state = {'item': None, 'photo': None, 'photo_format': None, 'key': None, 'region': None}
+            self.composites[name] = state
+        
+        # Zoomed document pixels around the window, kept while small pans stay inside it
+        width = self.canvas.winfo_width() if self.canvas.winfo_width() > 1 else self.canvas_width
+        height = self.canvas.winfo_height() if self.canvas.winfo_height() > 1 else self.canvas_height
+        needed = (math.floor(-self.view_offset[0]), math.floor(-self.view_offset[1]),
+                  math.ceil(width - self.view_offset[0]), math.ceil(height - self.view_offset[1]))
+        region = state['region']
+        if (region is None or state['key'][0] != self.zoom or
+                region[0] > needed[0] or region[1] > needed[1] or region[2] < needed[2] or region[3] < needed[3]):
+            margin = self.render_margin
+            region = (needed[0] - margin, needed[1] - margin, needed[2] + margin, needed[3] + margin)
+        
+        key = (self.zoom, region, tuple((img_data.uid, img_data.version, img_data.transform_version)
+                                        for img_data in layers))
+        if state['key'] != key:
+            start = time.perf_counter()
+            composite = self.compose_layers(layers, region)
+            photo = state['photo']
+            if photo is not None and state['photo_format'] == composite.size:
+                photo.paste(composite)
+            else:
+                photo = ImageTk.PhotoImage(composite)
+                state['photo'] = photo  # Keep reference
+                state['photo_format'] = composite.size
+                if state['item'] is None:
+                    state['item'] = self.canvas.create_image(0, 0, anchor="nw", image=photo, tags="layer")
+                else:
+                    self.canvas.itemconfigure(state['item'], image=photo)
+            state['key'] = key
+            state['region'] = region
+            self.render_stats['composites_built'] += 1
+            logger.debug("Flattened %s layers %s the active layer in %.1f ms",
+                         len(layers), name, (time.perf_counter() - start) * 1000)
+        
+        self.canvas.coords(state['item'], region[0] + self.view_offset[0], region[1] + self.view_offset[1])
+        return state['item']
+        
+    def compose_layers(self, layers, region):
+        """Flatten layers (bottom to top) into an RGBA image of region, given in zoomed document pixels"""
+        x1, y1, x2, y2 = region
+        composite = Image.new("RGBA", (x2 - x1, y2 - y1), (0, 0, 0, 0))
+        
+        for img_data in layers:
+            img = self.layer_display_image(img_data)
+            
+            # Part of the zoomed layer inside the region
+            left = round(img_data['position'][0] * self.zoom)
+            top = round(img_data['position'][1] * self.zoom)
+            right = left + max(1, round(img.width * self.zoom))
+            bottom = top + max(1, round(img.height * self.zoom))
+            px1, py1 = max(left, x1), max(top, y1)
+            px2, py2 = min(right, x2), min(bottom, y2)
+            if px1 >= px2 or py1 >= py2:
+                continue
+            
+            # Resample just that part, from the nearest mipmap level when zoomed out
+            if self.zoom < 1:
+                source, scale = self.layer_pyramid(img_data, img).level_for(self.zoom)
+                resample = Image.BILINEAR
+            else:
+                source, scale = img, 1.0
+                resample = Image.NEAREST
+            factor = scale / self.zoom
+            box = ((px1 - left) * factor, (py1 - top) * factor, (px2 - left) * factor, (py2 - top) * factor)
+            piece = source.resize((px2 - px1, py2 - py1), resample, box=box)
+            
+            dest = (px1 - x1, py1 - y1)
+            if piece.mode in ("RGBA", "LA", "PA") or "transparency" in piece.info:
+                composite.alpha_composite(piece.convert("RGBA"), dest)
+            else:
+                composite.paste(piece.convert("RGB"), dest)
+        return composite
+        
+    def set_render_mode(self, mode):
+        """Switch between "layers" and "composite" rendering, rebuilding the canvas"""
+        if mode == self.render_mode:
+            return
+        self.render_mode = mode
+        logger.debug("Render mode set to %s", mode)
+        self.request_redraw(full_rebuild=True)
+        
+    def toggle_composite_mode(self):
+        """Switch flattened rendering of inactive layers on or off"""
+        self.set_render_mode("composite" if self.composite_mode_checkbox.get() else "layers")
+        
+    def restack_layers(self):
+        """Stack layer items in list order, below drawings, text and highlight"""
+        self.rendered_order = [img_data['uid'] for img_data in self.images]
+        self.layer_z = {uid: i for i, uid in enumerate(self.rendered_order)}
+        for uid in reversed(self.rendered_order):
+            if uid in self.rendered_layers:  # Culled layers that were never shown have no item
+                self.canvas.tag_lower(self.rendered_layers[uid]['item'])
+        logger.debug("Restacked %s layers", len(self.rendered_order))
+                
+    def move_layer(self, index, new_index):
+        """Move a layer to another place in the stack, restacking only its own canvas item"""
+        in_sync = self.rendered_order == [img_data['uid'] for img_data in self.images]
+        img_data = self.images.pop(index)
+        self.images.insert(new_index, img_data)
+        
+        if not in_sync or self.render_mode != "layers":
+            # Let the next update restack (or re-flatten) everything
+            return
+        state = self.rendered_layers.get(img_data['uid'])
+        if state is not None:
+            self.place_layer_item(new_index, state['item'])
+        self.rendered_order.insert(new_index, self.rendered_order.pop(index))
+        for i in range(min(index, new_index), max(index, new_index) + 1):
+            self.layer_z[self.rendered_order[i]] = i
+        logger.debug("Moved layer %s to %s", index, new_index)
+        
+    def place_layer_item(self, index, item):
+        """Stack a layer item directly above the nearest lower layer item, or below the nearest higher one"""
+        for img_data in reversed(self.images[:index]):
+            state = self.rendered_layers.get(img_data['uid'])
+            if state is not None:
+                self.canvas.tag_raise(item, state['item'])
+                return
+        for img_data in self.images[index + 1:]:
+            state = self.rendered_layers.get(img_data['uid'])
+            if state is not None:
+                self.canvas.tag_lower(item, state['item'])
+                return
                 
+    def remove_layer(self, index):
+        """Remove a layer from the stack and delete only its canvas item, returns the removed layer"""
+        in_sync = self.rendered_order == [img_data['uid'] for img_data in self.images]
+        img_data = self.images.pop(index)
+        uid = img_data['uid']
+        
+        state = self.rendered_layers.pop(uid, None)
+        if state is not None:
+            self.canvas.delete(state['item'])
+        self.spatial_index.remove(uid)
+        self.hit_masks.pop(uid, None)
+        self.mipmaps.pop(uid, None)
+        self.layer_opacity.pop(uid, None)
+        self.layer_previews.pop(uid, None)
+        
+        if in_sync:
+            self.rendered_order.pop(index)
+            del self.layer_z[uid]
+            for i in range(index, len(self.rendered_order)):
+                self.layer_z[self.rendered_order[i]] = i
+        logger.debug("Removed layer %s", index)
+        return img_data
+        
+    def set_layer_visible(self, index, visible):
+        """Show or hide a layer by switching the state of its canvas item"""
+        img_data = self.images[index]
+        img_data['visible'] = visible
+        self.update_layer_bounds(img_data)
+        
+        state = self.rendered_layers.get(img_data['uid'])
+        if state is not None and state['visible'] != visible:
+            self.canvas.itemconfigure(state['item'], state="normal" if visible else "hidden")
+            state['visible'] = visible
+        # Culling and composites depend on which layers are visible
+        self.request_redraw()
+        
     def update_status(self, message):
         """Update status label"""
-        print(f"DEBUG: Status update: {message}")
+        logger.debug("Status update: %s", message)
         self.status_label.configure(text=message)
         
     def update_image_info(self):
         """Update image information display"""
-        print(f"DEBUG: update_image_info called - total images: {len(self.images)}, selected: {self.selected_image_index}")
+        logger.debug("update_image_info called - total images: %s, selected: %s", len(self.images), self.selected_image_index)
         
         if self.images:
             info = f"Images: {len(self.images)}\n"
             if self.selected_image_index >= 0:
                 info += f"Selected: Image {self.selected_image_index + 1}"
-                print(f"DEBUG: Image {self.selected_image_index + 1} is selected")
+                logger.debug("Image %s is selected", self.selected_image_index + 1)
             else:
                 info += "No image selected"
-                print(f"DEBUG: No image is selected")
+                logger.debug("No image is selected")
             self.image_info_label.configure(text=info)
         else:
             self.image_info_label.configure(text="No images loaded")
-            print(f"DEBUG: No images loaded")
+            logger.debug("No images loaded")
             
     def save_state(self):
         """Save current state for undo"""
-        print(f"DEBUG: Saving state - total images: {len(self.images)}, selected_index: {self.selected_image_index}")
+        if self.transaction_depth > 0:
+            # The open transaction already recorded the state before its changes
+            self.transaction_skipped += 1
+            return
         
-        # Deep copy image data
-        images_copy = []
-        for img_data in self.images:
-            img_copy = {
-                'image': img_data['image'].copy(),
-                'photo': img_data['photo'],  # This will be recreated when needed
-                'path': img_data['path'],
-                'position': img_data['position'],
-                'rotation': img_data['rotation'],
-                'visible': img_data['visible'],
-                'width': img_data['width'],
-                'height': img_data['height']
-            }
-            if 'id' in img_data:
-                img_copy['id'] = img_data['id']
-            images_copy.append(img_copy)
-        
-        state = {
-            'images': images_copy,
-            'current_index': self.current_image_index,
-            'selected_image_index': self.selected_image_index
-        }
+        logger.debug("Saving state - total images: %s, selected_index: %s", len(self.images), self.selected_image_index)
+        
+        self.push_state(self.capture_state())
+        
+    def push_state(self, state):
+        """Add a recorded state to the undo stack"""
         self.undo_stack.append(state)
         self.redo_stack.clear()  # Clear redo when new action is performed
         
-        print(f"DEBUG: State saved - undo stack size: {len(self.undo_stack)}")
+        logger.debug("State saved - undo stack size: %s", len(self.undo_stack))
+        self.enforce_history_budget()
         
         # Enable/disable undo/redo buttons
         self.undo_btn.configure(state="normal" if len(self.undo_stack) > 1 else "disabled")
         self.redo_btn.configure(state="disabled")
         
+    @contextmanager
+    def transaction(self, label):
+        """Group all changes made inside the block into one undo entry"""
+        self.transaction_depth += 1
+        outermost = self.transaction_depth == 1
+        if outermost:
+            before = self.capture_state()
+            self.transaction_skipped = 0
+        try:
+            yield
+        finally:
+            self.transaction_depth -= 1
+            if outermost:
+                if self.state_matches(before):
+                    logger.debug("Transaction '%s' made no changes, nothing recorded", label)
+                else:
+                    self.push_state(before)
+                    logger.debug("Transaction '%s' recorded as one undo entry, skipped %s snapshots",
+                                 label, self.transaction_skipped)
+                    
+    def state_matches(self, state):
+        """Return True if the document is unchanged since the state was recorded"""
+        records = state['images']
+        return (len(records) == len(self.images) and 
+                state['current_index'] == self.current_image_index and
+                all(record.matches(img_data) for record, img_data in zip(records, self.images)))
+        
+    def enforce_history_budget(self):
+        """Spill old history images to disk when over budget and show history memory use"""
+        live_images = []
+        for img_data in self.images:
+            live_images.append(img_data['image'])
+            live_images.append(img_data.get('original_image'))
+        self.history_spill.budget_bytes = self.history_budget_bytes
+        self.history_spill.enforce(self.undo_stack, self.redo_stack, live_images)
+        self.history_label.configure(text=self.history_spill.describe())
+        
+    def capture_state(self):
+        """Record the current document for the undo history"""
+        previous = self.undo_stack[-1]['images'] if self.undo_stack else ()
+        return {
+            'images': snapshot_layers(self.images, previous),
+            'current_index': self.current_image_index,
+            'selected_image_index': self.selected_image_index
+        }
+        
+    def restore_state(self, state):
+        """Replace the document with a recorded history state"""
+        # Restore images, the renderer only touches layers that differ
+        self.images = [record.to_layer() for record in state['images']]
+        self.current_image_index = state['current_index']
+        self.selected_image_index = state['selected_image_index']
+        
+        logger.debug("State restored - images: %s, selected: %s", len(self.images), self.selected_image_index)
+        
+        self.request_redraw()
+        
+        # Restore selection, the highlight is redrawn with the canvas
+        if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
+            self.selected_image = self.images[self.selected_image_index]
+        else:
+            self.clear_image_highlight()
+            self.selected_image = None
+        
     def undo(self):
         """Undo last action"""
-        print(f"DEBUG: Undo called - undo stack size: {len(self.undo_stack)}")
+        logger.debug("Undo called - undo stack size: %s", len(self.undo_stack))
         
         if len(self.undo_stack) > 1:  # Need at least 2 states to undo
-            print(f"DEBUG: Performing undo operation")
-            
-            # Save current state to redo (but first take a fresh snapshot)
-            current_images_copy = []
-            for img_data in self.images:
-                img_copy = {
-                    'image': img_data['image'].copy(),
-                    'photo': img_data['photo'],
-                    'path': img_data['path'],
-                    'position': img_data['position'],
-                    'rotation': img_data['rotation'],
-                    'visible': img_data['visible'],
-                    'width': img_data['width'],
-                    'height': img_data['height']
-                }
-                if 'id' in img_data:
-                    img_copy['id'] = img_data['id']
-                current_images_copy.append(img_copy)
-            
-            current_state = {
-                'images': current_images_copy,
-                'current_index': self.current_image_index,
-                'selected_image_index': self.selected_image_index
-            }
+            logger.debug("Performing undo operation")
+            
+            # Save current state to redo
+            current_state = self.capture_state()
             self.redo_stack.append(current_state)
-            print(f"DEBUG: Current state saved to redo stack")
+            logger.debug("Current state saved to redo stack")
             
             # Restore previous state
             state = self.undo_stack.pop()
-            print(f"DEBUG: Restoring previous state")
-            
-            # Clear current canvas
-            self.canvas.delete("all")
+            logger.debug("Restoring previous state")
             
-            # Restore images and recreate them on canvas
-            self.images = []
-            for img_data in state['images']:
-                # Recreate PhotoImage
-                photo = ImageTk.PhotoImage(img_data['image'])
-                img_data['photo'] = photo
-                
-                # Create image on canvas
-                x, y = img_data['position']
-                image_id = self.canvas.create_image(x, y, anchor="nw", image=photo)
-                img_data['id'] = image_id
-                
-                self.images.append(img_data)
-            
-            self.current_image_index = state['current_index']
-
-            self.selected_image_index = state['selected_image_index']
-            
-            print(f"DEBUG: State restored - images: {len(self.images)}, selected: {self.selected_image_index}")
-            
-            # Restore selection and highlight
-            if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
-                self.selected_image = self.images[self.selected_image_index]
-                self.highlight_selected_image()
-            else:
-                self.clear_image_highlight()
-                self.selected_image = None
+            self.restore_state(state)
+            self.enforce_history_budget()
             
             self.update_image_info()
             
@@ -614,76 +1258,28 @@ class GraphicsEditor:
             self.undo_btn.configure(state="normal" if len(self.undo_stack) > 1 else "disabled")
             self.redo_btn.configure(state="normal" if self.redo_stack else "disabled")
             
-            print(f"DEBUG: Undo completed successfully")
+            logger.debug("Undo completed successfully")
         else:
-            print(f"DEBUG: Cannot undo - insufficient states in stack")
+            logger.debug("Cannot undo - insufficient states in stack")
             
     def redo(self):
         """Redo last undone action"""
-        print(f"DEBUG: Redo called - redo stack size: {len(self.redo_stack)}")
+        logger.debug("Redo called - redo stack size: %s", len(self.redo_stack))
         
         if self.redo_stack:
-            print(f"DEBUG: Performing redo operation")
-            
-            # Save current state to undo (take fresh snapshot)
-            current_images_copy = []
-            for img_data in self.images:
-                img_copy = {
-                    'image': img_data['image'].copy(),
-                    'photo': img_data['photo'],
-                    'path': img_data['path'],
-                    'position': img_data['position'],
-                    'rotation': img_data['rotation'],
-                    'visible': img_data['visible'],
-                    'width': img_data['width'],
-                    'height': img_data['height']
-                }
-                if 'id' in img_data:
-                    img_copy['id'] = img_data['id']
-                current_images_copy.append(img_copy)
-            
-            current_state = {
-                'images': current_images_copy,
-                'current_index': self.current_image_index,
-                'selected_image_index': self.selected_image_index
-            }
+            logger.debug("Performing redo operation")
+            
+            # Save current state to undo
+            current_state = self.capture_state()
             self.undo_stack.append(current_state)
-            print(f"DEBUG: Current state saved to undo stack")
+            logger.debug("Current state saved to undo stack")
             
             # Restore redo state
             state = self.redo_stack.pop()
-            print(f"DEBUG: Restoring redo state")
+            logger.debug("Restoring redo state")
             
-            # Clear current canvas
-            self.canvas.delete("all")
-            
-            # Restore images and recreate them on canvas
-            self.images = []
-            for img_data in state['images']:
-                # Recreate PhotoImage
-                photo = ImageTk.PhotoImage(img_data['image'])
-                img_data['photo'] = photo
-                
-                # Create image on canvas
-                x, y = img_data['position']
-                image_id = self.canvas.create_image(x, y, anchor="nw", image=photo)
-                img_data['id'] = image_id
-                
-                self.images.append(img_data)
-            
-            self.current_image_index = state['current_index']
-
-            self.selected_image_index = state['selected_image_index']
-            
-            print(f"DEBUG: State restored - images: {len(self.images)}, selected: {self.selected_image_index}")
-            
-            # Restore selection and highlight
-            if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
-                self.selected_image = self.images[self.selected_image_index]
-                self.highlight_selected_image()
-            else:
-                self.clear_image_highlight()
-                self.selected_image = None
+            self.restore_state(state)
+            self.enforce_history_budget()
             
             self.update_image_info()
             
@@ -691,38 +1287,25 @@ class GraphicsEditor:
             self.undo_btn.configure(state="normal" if len(self.undo_stack) > 1 else "disabled")
             self.redo_btn.configure(state="normal" if self.redo_stack else "disabled")
             
-            print(f"DEBUG: Redo completed successfully")
+            logger.debug("Redo completed successfully")
         else:
-            print(f"DEBUG: Cannot redo - redo stack is empty")
+            logger.debug("Cannot redo - redo stack is empty")
 
     def select_image_at_position(self, x, y):
         """Select image at given canvas coordinates"""
-        # Find which image was clicked
+        # Find which image was clicked - the topmost layer whose bounds contain the point
         clicked_image_index = -1
         
-        print(f"DEBUG: Checking for image at position ({x}, {y})")
-        print(f"DEBUG: Total images: {len(self.images)}")
+        logger.debug("Checking for image at position (%s, %s)", x, y)
         
-        # Check images in reverse order (top to bottom visually)
-        for i in range(len(self.images) - 1, -1, -1):
-            image_data = self.images[i]
-            img_x = image_data['position'][0]
-            img_y = image_data['position'][1]
-            img_width = image_data['width']
-            img_height = image_data['height']
-            
-            print(f"DEBUG: Image {i}: pos=({img_x}, {img_y}), size=({img_width}, {img_height})")
-            print(f"DEBUG: Click at ({x}, {y}) - checking bounds: x in [{img_x}, {img_x + img_width}], y in [{img_y}, {img_y + img_height}]")
-            
-            if (img_x <= x <= img_x + img_width and 
-                img_y <= y <= img_y + img_height):
-                clicked_image_index = i
-                print(f"DEBUG: Found image {i} at position ({x}, {y})")
-                break
+        candidates = self.layers_at_position(x, y)
+        if candidates:
+            clicked_image_index = candidates[-1]
+            logger.debug("Found image %s at position (%s, %s) among %s candidates", clicked_image_index, x, y, len(candidates))
         
         # Update selection
         if clicked_image_index != self.selected_image_index:
-            print(f"DEBUG: Changing selection from {self.selected_image_index} to {clicked_image_index}")
+            logger.debug("Changing selection from %s to %s", self.selected_image_index, clicked_image_index)
             
             # Clear previous selection
             if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
@@ -732,48 +1315,189 @@ class GraphicsEditor:
             if clicked_image_index >= 0 and clicked_image_index < len(self.images):
                 self.selected_image = self.images[clicked_image_index]
                 self.highlight_selected_image()
-                print(f"DEBUG: Selected image {clicked_image_index}: {self.selected_image['path']}")
+                logger.debug("Selected image %s: %s", clicked_image_index, self.selected_image['path'])
             else:
                 self.selected_image = None
-                print(f"DEBUG: No image selected")
+                logger.debug("No image selected")
             
             self.update_image_info()
             
+            if self.render_mode == "composite":
+                # The newly selected layer becomes the live item, the rest are flattened again
+                self.request_redraw()
+            
             # Update menu button states when selection changes
             try:
                 if self.file_menu and hasattr(self.file_menu, 'file_window'):
                     self.file_menu.update_buttons()
             except Exception as e:
-                print(f"DEBUG: Error updating file menu buttons: {e}")
+                logger.warning("Error updating file menu buttons: %s", e)
             
             # Update other menu button states
             try:
                 if self.filters_menu and hasattr(self.filters_menu, 'filters_window'):
                     self.filters_menu.update_apply_buttons()
             except Exception as e:
-                print(f"DEBUG: Error updating filters menu buttons: {e}")
+                logger.warning("Error updating filters menu buttons: %s", e)
             try:
                 if self.rotate_menu and hasattr(self.rotate_menu, 'rotate_window'):
                     self.rotate_menu.update_apply_buttons()
             except Exception as e:
-                print(f"DEBUG: Error updating rotate menu buttons: {e}")
+                logger.warning("Error updating rotate menu buttons: %s", e)
             try:
                 if self.trim_menu and hasattr(self.trim_menu, 'trim_window'):
                     self.trim_menu.update_apply_buttons()
             except Exception as e:
-                print(f"DEBUG: Error updating trim menu buttons: {e}")
+                logger.warning("Error updating trim menu buttons: %s", e)
         else:
-            print(f"DEBUG: Selection unchanged: {self.selected_image_index}")
+            logger.debug("Selection unchanged: %s", self.selected_image_index)
 
+    def sync_spatial_index(self):
+        """Apply a pending redraw so the spatial index reflects the latest layer changes"""
+        if self.redraw_pending is not None:
+            self.update_canvas()
+            
+    def layers_at_position(self, x, y):
+        """Return indices of visible layers containing the point, bottom to top"""
+        self.sync_spatial_index()
+        indices = sorted(self.layer_z[uid] for uid in self.spatial_index.query_point(x, y))
+        if self.pixel_accurate_picking:
+            indices = [i for i in indices if self.layer_hit_test(self.images[i], x, y)]
+        return indices
+        
+    def layer_hit_test(self, img_data, x, y):
+        """Return True if the canvas point lands on an opaque pixel of the layer as displayed"""
+        mask = self.get_hit_mask(img_data)
+        return mask.hit(x - img_data['position'][0], y - img_data['position'][1])
+        
+    def get_hit_mask(self, img_data):
+        """Return the alpha hit mask of a layer, building it once per pixel version and rotation"""
+        key = (img_data['version'], img_data['rotation'])
+        cached = self.hit_masks.get(img_data['uid'])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        # Same rotated raster the canvas shows, so the mask follows the layer's rotation
+        displayed = rotate_layer_image(img_data['image'], img_data['rotation'], img_data['version'])
+        mask = AlphaHitMask(displayed)
+        self.hit_masks[img_data['uid']] = (key, mask)
+        return mask
+        
+    def toggle_pixel_accurate_picking(self):
+        """Switch between bounding box and alpha-aware layer picking"""
+        self.pixel_accurate_picking = bool(self.pixel_picking_checkbox.get())
+        if not self.pixel_accurate_picking:
+            self.hit_masks = {}
+        
+    def layers_in_rect(self, x1, y1, x2, y2):
+        """Return indices of visible layers intersecting a rectangle (rubber-band selection), bottom to top"""
+        self.sync_spatial_index()
+        return sorted(self.layer_z[uid] for uid in self.spatial_index.query_rect(x1, y1, x2, y2))
+        
+    def doc_to_view(self, x, y):
+        """Convert document coordinates to canvas widget coordinates"""
+        return (x * self.zoom + self.view_offset[0], y * self.zoom + self.view_offset[1])
+        
+    def view_to_doc(self, x, y):
+        """Convert canvas widget coordinates (event.x, event.y) to document coordinates"""
+        return ((x - self.view_offset[0]) / self.zoom, (y - self.view_offset[1]) / self.zoom)
+        
+    def visible_doc_rect(self):
+        """Return the document rectangle shown in the canvas widget"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # Not mapped yet, use the requested size
+            width, height = self.canvas_width, self.canvas_height
+        x1, y1 = self.view_to_doc(0, 0)
+        x2, y2 = self.view_to_doc(width, height)
+        return (x1, y1, x2, y2)
+        
+    def place_overlay(self, item):
+        """Move an item or tag created in document coordinates to its place in the current view
+        
+        Menus create drawings, text and selection shapes in document coordinates and
+        call this once. Later zooms and pans transform every canvas item together.
+        """
+        if self.zoom != 1:
+            self.canvas.scale(item, 0, 0, self.zoom, self.zoom)
+        if self.view_offset != (0.0, 0.0):
+            self.canvas.move(item, *self.view_offset)
+            
+    def set_zoom(self, zoom, anchor_x=None, anchor_y=None):
+        """Zoom the view keeping the given canvas widget point fixed (default: window center)"""
+        zoom = max(self.min_zoom, min(self.max_zoom, zoom))
+        if zoom == self.zoom:
+            return
+        if anchor_x is None or anchor_y is None:
+            anchor_x = self.canvas.winfo_width() / 2 if self.canvas.winfo_width() > 1 else self.canvas_width / 2
+            anchor_y = self.canvas.winfo_height() / 2 if self.canvas.winfo_height() > 1 else self.canvas_height / 2
+        
+        factor = zoom / self.zoom
+        self.zoom = zoom
+        self.view_offset = (anchor_x - (anchor_x - self.view_offset[0]) * factor,
+                            anchor_y - (anchor_y - self.view_offset[1]) * factor)
+        
+        # Overlays follow the view, layers get re-rendered at the new zoom
+        self.canvas.scale("all", anchor_x, anchor_y, factor, factor)
+        self.zoom_label.configure(text=f"{round(self.zoom * 100)}%")
+        self.request_redraw()
+        
+    def zoom_by(self, factor, anchor_x=None, anchor_y=None):
+        """Multiply the zoom level by factor"""
+        self.set_zoom(self.zoom * factor, anchor_x, anchor_y)
+        
+    def pan_by(self, dx, dy):
+        """Scroll the view by dx, dy canvas widget pixels"""
+        if dx == 0 and dy == 0:
+            return
+        self.view_offset = (self.view_offset[0] + dx, self.view_offset[1] + dy)
+        self.canvas.move("all", dx, dy)
+        self.request_redraw()
+        
+    def reset_view(self):
+        """Show the document at 100% with its origin in the corner"""
+        self.set_zoom(1.0, 0, 0)
+        self.pan_by(-self.view_offset[0], -self.view_offset[1])
+        
+    def on_canvas_wheel(self, event):
+        """Zoom with Ctrl+wheel at the pointer, scroll otherwise (Shift for horizontal)"""
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            direction = 1
+        else:
+            direction = -1
+        if event.state & 0x0004:  # Control
+            self.zoom_by(1.25 if direction > 0 else 0.8, event.x, event.y)
+        elif event.state & 0x0001:  # Shift
+            self.pan_by(direction * 60, 0)
+        else:
+            self.pan_by(0, direction * 60)
+            
+    def start_pan(self, event):
+        """Start panning with the middle mouse button"""
+        self.pan_last = (event.x, event.y)
+        self.canvas.configure(cursor="fleur")
+        
+    def continue_pan(self, event):
+        """Pan the view with the pointer"""
+        if self.pan_last is None:
+            return
+        self.pan_by(event.x - self.pan_last[0], event.y - self.pan_last[1])
+        self.pan_last = (event.x, event.y)
+        
+    def stop_pan(self, event):
+        """Stop panning"""
+        self.pan_last = None
+        self.canvas.configure(cursor="")
+        
     def highlight_selected_image(self):
         """Highlight the currently selected image with a dashed border"""
-        print(f"DEBUG: Highlighting selected image at index {self.selected_image_index}")
+        logger.debug("Highlighting selected image at index %s", self.selected_image_index)
         
         if self.selected_image and self.selected_image_index >= 0:
             # Remove previous highlight if exists
             if self.highlight_rect:
                 self.canvas.delete(self.highlight_rect)
-                print(f"DEBUG: Removed previous highlight {self.highlight_rect}")
+                logger.debug("Removed previous highlight %s", self.highlight_rect)
             
             # Create dashed border around selected image
             x = self.selected_image['position'][0]
@@ -781,7 +1505,7 @@ class GraphicsEditor:
             width = self.selected_image['width']
             height = self.selected_image['height']
             
-            print(f"DEBUG: Creating highlight at ({x}, {y}) with size ({width}, {height})")
+            logger.debug("Creating highlight at (%s, %s) with size (%s, %s)", x, y, width, height)
             
             # Create dashed rectangle
             self.highlight_rect = self.canvas.create_rectangle(
@@ -790,58 +1514,59 @@ class GraphicsEditor:
                 width=2,
                 dash=(5, 5)
             )
+            self.place_overlay(self.highlight_rect)
             
             # Bring highlight to front
             self.canvas.tag_raise(self.highlight_rect)
-            print(f"DEBUG: Created highlight rectangle with ID {self.highlight_rect}")
+            logger.debug("Created highlight rectangle with ID %s", self.highlight_rect)
         else:
-            print(f"DEBUG: Cannot highlight - selected_image: {self.selected_image}, selected_index: {self.selected_image_index}")
+            logger.debug("Cannot highlight - selected_image: %s, selected_index: %s", self.selected_image, self.selected_image_index)
 
     def clear_image_highlight(self):
         """Clear the image highlight"""
         if self.highlight_rect:
-            print(f"DEBUG: Clearing highlight rectangle {self.highlight_rect}")
+            logger.debug("Clearing highlight rectangle %s", self.highlight_rect)
             self.canvas.delete(self.highlight_rect)
             self.highlight_rect = None
         else:
-            print(f"DEBUG: No highlight to clear")
+            logger.debug("No highlight to clear")
 
     def start_image_drag(self, x, y):
         """Start dragging the selected image"""
-        print(f"DEBUG: start_image_drag called at ({x}, {y})")
-        print(f"DEBUG: selected_image: {self.selected_image is not None}, selected_index: {self.selected_image_index}, total_images: {len(self.images)}")
+        logger.debug("start_image_drag called at (%s, %s)", x, y)
+        logger.debug("selected_image: %s, selected_index: %s, total_images: %s", self.selected_image is not None, self.selected_image_index, len(self.images))
         
         if (self.selected_image and self.selected_image_index >= 0 and 
             self.selected_image_index < len(self.images)):
             
-            print(f"DEBUG: Starting drag at ({x}, {y}) for image {self.selected_image_index}")
+            logger.debug("Starting drag at (%s, %s) for image %s", x, y, self.selected_image_index)
             self.is_dragging = True
             self.drag_start_x = x
             self.drag_start_y = y
             self.drag_offset_x = x - self.selected_image['position'][0]
             self.drag_offset_y = y - self.selected_image['position'][1]
             
-            print(f"DEBUG: Drag offsets: x={self.drag_offset_x}, y={self.drag_offset_y}")
+            logger.debug("Drag offsets: x=%s, y=%s", self.drag_offset_x, self.drag_offset_y)
             
             # Change cursor to indicate dragging
             self.canvas.configure(cursor="fleur")
-            print(f"DEBUG: Drag started successfully - is_dragging: {self.is_dragging}")
+            logger.debug("Drag started successfully - is_dragging: %s", self.is_dragging)
         else:
-            print(f"DEBUG: Cannot start drag - selected_image: {self.selected_image}, selected_index: {self.selected_image_index}, total_images: {len(self.images)}")
+            logger.debug("Cannot start drag - selected_image: %s, selected_index: %s, total_images: %s", self.selected_image, self.selected_image_index, len(self.images))
             if self.selected_image_index >= 0 and self.selected_image_index < len(self.images):
-                print(f"DEBUG: Image at index exists: {self.images[self.selected_image_index]}")
+                logger.debug("Image at index exists: %s", self.images[self.selected_image_index])
             # Reset dragging state if validation fails
             self.is_dragging = False
-            print(f"DEBUG: Drag start failed - is_dragging reset to: {self.is_dragging}")
+            logger.debug("Drag start failed - is_dragging reset to: %s", self.is_dragging)
 
     def continue_image_drag(self, x, y):
         """Continue dragging the selected image"""
         if self.is_dragging and self.selected_image and self.selected_image_index >= 0:
-            print(f"DEBUG: Continuing drag to ({x}, {y})")
+            logger.debug("Continuing drag to (%s, %s)", x, y)
             
             # Verify the selected image still exists
             if self.selected_image_index >= len(self.images):
-                print(f"DEBUG: Selected image index out of range, stopping drag")
+                logger.debug("Selected image index out of range, stopping drag")
                 self.stop_image_drag()
                 return
             
@@ -853,29 +1578,31 @@ class GraphicsEditor:
             new_x = max(0, min(new_x, self.canvas_width - self.selected_image['width']))
             new_y = max(0, min(new_y, self.canvas_height - self.selected_image['height']))
             
-            print(f"DEBUG: Moving image from {self.selected_image['position']} to ({new_x}, {new_y})")
+            logger.debug("Moving image from %s to (%s, %s)", self.selected_image['position'], new_x, new_y)
             
             # Move image on canvas
             try:
-                self.canvas.coords(self.selected_image['id'], new_x, new_y)  # <-- poprawka
-                
-                # Update image data
+                # Update image data, then move (or re-render the visible part of) its canvas item
                 self.selected_image['position'] = (new_x, new_y)
+                self.render_layer(self.selected_image_index, self.selected_image)
+                if self.occlusion_culling:
+                    # Moving an opaque layer can cover or uncover others
+                    self.request_redraw()
                 
                 # Update highlight position
                 if self.highlight_rect:
                     self.canvas.coords(self.highlight_rect, 
-                                     new_x, new_y, 
-                                     new_x + self.selected_image['width'], 
-                                     new_y + self.selected_image['height'])
+                                     *self.doc_to_view(new_x, new_y), 
+                                     *self.doc_to_view(new_x + self.selected_image['width'], 
+                                                       new_y + self.selected_image['height']))
                     # Ensure highlight stays on top
                     self.canvas.tag_raise(self.highlight_rect)
                     
             except Exception as e:
-                print(f"DEBUG: Error during drag: {e}")
+                logger.warning("Error during drag: %s", e)
                 self.stop_image_drag()
         else:
-            print(f"DEBUG: Cannot continue drag - is_dragging: {self.is_dragging}, selected_image: {self.selected_image}, selected_index: {self.selected_image_index}")
+            logger.debug("Cannot continue drag - is_dragging: %s, selected_image: %s, selected_index: %s", self.is_dragging, self.selected_image, self.selected_image_index)
             if self.is_dragging:
                 self.stop_image_drag()
             # Reset dragging state if validation fails
@@ -884,17 +1611,19 @@ class GraphicsEditor:
     def stop_image_drag(self):
         """Stop dragging the selected image"""
         if self.is_dragging:
-            print(f"DEBUG: Stopping image drag")
+            logger.debug("Stopping image drag")
             self.is_dragging = False
             self.canvas.configure(cursor="")
             
             # Save state for undo/redo
             self.save_state()
         else:
-            print(f"DEBUG: No drag to stop")
+            logger.debug("No drag to stop")
 
     def run(self):
         """Start the application"""
+        # Runs once the window has been mapped and drawn
+        self.root.after_idle(import_profile.report, "First window")
         self.root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+from image_cache import image_nbytes
+from thumbnail_cache import thumbnail_cache
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
+
+class LazySource:
+    def __init__(self, path, size, proxy_size):
+        self.path = path
+        self.size = size  # Full resolution (width, height) read from the file header
+        self.scale = size[0] / proxy_size[0] if proxy_size[0] else 1.0  # Source pixels per proxy pixel
+    
+    def load(self):
+        """Decode the full-resolution image (not cached, export is rare and the pixels are large)"""
+        img = Image.open(self.path)
+        img.load()
+        return img
+
+
+class MemorySource:
+    def __init__(self, image, proxy_size):
+        self.path = None
+        self.image = image  # Pixels that were never written to a file, e.g. AI generated images
+        self.size = image.size
+        self.scale = image.width / proxy_size[0] if proxy_size[0] else 1.0
+    
+    def load(self):
+        """Return the full-resolution pixels kept in memory"""
+        return self.image
+
+
+# Totals over every proxy load, for the debug output and status bar
+load_stats = {'images': 0, 'cache_hits': 0, 'seconds': 0.0, 'decoded_bytes': 0, 'full_bytes': 0}
+load_stats_lock = threading.Lock()  # Proxies are loaded from import worker threads
+
+# Decode and box-reduce to at least this multiple of the target size before the
+# final LANCZOS pass, the same quality margin Image.thumbnail uses
+REDUCING_GAP = 2.0
+
+# Modes Image.reduce() rejects, these go straight to resize()
+REDUCE_UNSUPPORTED_MODES = ("1", "P", "I;16", "I;16L", "I;16B", "I;16N", "BGR;15", "BGR;16", "BGR;24")
+
+
+def fit_size(size, max_size):
+    """Return size scaled down to fit in max_size, keeping the aspect ratio"""
+    width, height = size
+    ratio = min(max_size[0] / width, max_size[1] / height)
+    if ratio >= 1:
+        return size
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def load_proxy(image_path, max_size):
+    """Open an image file and return (display proxy, LazySource for the full-resolution pixels)
+    
+    Only the proxy is decoded. JPEGs are decoded at a reduced DCT scale with draft()
+    and other formats are shrunk with reduce() before the final LANCZOS resize.
+    """
+    start = time.perf_counter()
+    
+    cached = thumbnail_cache.get(image_path, max_size)
+    if cached is not None:
+        img, full_size = cached
+        seconds = time.perf_counter() - start
+        with load_stats_lock:
+            load_stats['images'] += 1
+            load_stats['cache_hits'] += 1
+            load_stats['seconds'] += seconds
+        logger.debug("Loaded cached proxy %s of %s %s in %.1f ms", img.size, full_size, image_path, seconds * 1000)
+        return img, LazySource(image_path, full_size, img.size)
+    
+    img = Image.open(image_path)
+    full_size = img.size
+    target = fit_size(full_size, max_size)
+    gap_size = (round(target[0] * REDUCING_GAP), round(target[1] * REDUCING_GAP))
+    
+    if target != full_size and img.format == "JPEG":
+        # Let libjpeg skip DCT coefficients - decodes at 1/2, 1/4 or 1/8 scale
+        img.draft(img.mode, gap_size)
+    img.load()
+    decoded_bytes = image_nbytes(img)
+    
+    if target != img.size:
+        factor = min(img.width // gap_size[0], img.height // gap_size[1])
+        if factor >= 2 and img.mode not in REDUCE_UNSUPPORTED_MODES:
+            img = img.reduce(factor)
+        img = img.resize(target, Image.Resampling.LANCZOS)
+    
+    seconds = time.perf_counter() - start
+    full_bytes = full_size[0] * full_size[1] * len(img.getbands())
+    with load_stats_lock:
+        load_stats['images'] += 1
+        load_stats['seconds'] += seconds
+        load_stats['decoded_bytes'] += decoded_bytes
+        load_stats['full_bytes'] += full_bytes
+    logger.debug("Loaded proxy %s of %s %s in %.1f ms, decoded %.1f MB of %.1f MB", img.size, full_size, image_path,
+                 seconds * 1000, decoded_bytes / (1024 * 1024), full_bytes / (1024 * 1024))
+    
+    thumbnail_cache.put(image_path, max_size, img, full_size)
+    return img, LazySource(image_path, full_size, img.size)
+
+
+def proxy_from_image(img, max_size):
+    """Return (display proxy, MemorySource) for an image that only exists in memory"""
+    target = fit_size(img.size, max_size)
+    proxy = img if target == img.size else img.resize(target, Image.Resampling.LANCZOS)
+    return proxy, MemorySource(img, proxy.size)
+
+
+# Edits are stored on a layer as (function, params) and replayed at export.
+# Each function takes the image, the source/proxy scale factor and the params,
+# with any pixel coordinates given in proxy pixels.
+def crop_edit(img, scale, box):
+    """Crop to a box given in proxy coordinates"""
+    return img.crop(tuple(round(v * scale) for v in box))
+
+
+def resize_edit(img, scale, size):
+    """Resize to a size given in proxy pixels"""
+    width, height = size
+    return img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.Resampling.LANCZOS)
+
+
+def flip_edit(img, scale, direction):
+    """Mirror horizontally, vertically or both"""
+    if direction in ("horizontal", "both"):
+        img = ImageOps.mirror(img)
+    if direction in ("vertical", "both"):
+        img = ImageOps.flip(img)
+    return img
+
+
+def render_full_resolution(img_data):
+    """Return the layer's pixels at source resolution, or the proxy if its edits can't be replayed"""
+    source = img_data.get('source')
+    edits = img_data.get('edits')
+    if source is None or edits is None:
+        return img_data['image']
+    
+    try:
+        img = source.load()
+    except OSError as e:
+        # The file was moved or deleted since import, the proxy is all that is left
+        logger.warning("Can't read source %s, exporting the display proxy instead: %s", source.path, e)
+        return img_data['image']
+    for func, params in edits:
+        img = func(img, source.scale, **params)
+    logger.debug("Replayed %s edits on %s source of %s", len(edits), source.size, img_data['path'])
+    return img
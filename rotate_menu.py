@@ -3,6 +3,8 @@ import tkinter as tk
 from PIL import Image, ImageOps
 import math
 
+from proxy_pipeline import flip_edit
+
 class RotateMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -314,7 +316,7 @@ class RotateMenu:
         selected_img_data = self.editor.images[self.editor.selected_image_index]
         selected_img_data['rotation'] = (selected_img_data['rotation'] + angle) % 360
         
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_status(f"Rotated selected image by {angle}°")
         
     def rotate_all_images(self, angle):
@@ -328,7 +330,7 @@ class RotateMenu:
         for img_data in self.editor.images:
             img_data['rotation'] = (img_data['rotation'] + angle) % 360
         
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_status(f"Rotated all images by {angle}°")
         
     def rotate_canvas(self, angle):
@@ -367,7 +369,7 @@ class RotateMenu:
             # Also rotate the image itself
             img_data['rotation'] = (img_data['rotation'] + angle) % 360
         
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_status(f"Rotated entire canvas by {angle}°")
         
     def rotate_by_custom_angle(self):
@@ -391,7 +393,7 @@ class RotateMenu:
         selected_img_data = self.editor.images[self.editor.selected_image_index]
         selected_img_data['rotation'] = (selected_img_data['rotation'] + angle) % 360
         
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_status(f"Rotated selected image by {angle}°")
         
         # Clear entry
@@ -416,7 +418,7 @@ class RotateMenu:
         selected_img_data = self.editor.images[self.editor.selected_image_index]
         selected_img_data['rotation'] = (selected_img_data['rotation'] + angle) % 360
         
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         self.editor.update_status(f"Applied slider rotation: {angle}° to selected image")
         
         # Reset slider
@@ -491,7 +493,7 @@ class RotateMenu:
             selected_img_data = self.editor.images[self.editor.selected_image_index]
             selected_img_data['rotation'] = (selected_img_data['rotation'] + rotation_diff) % 360
             
-            self.editor.update_canvas()
+            self.editor.request_redraw()
             
             # Update start position for smooth rotation
             self.rotation_start = (x, y)
@@ -522,8 +524,8 @@ class RotateMenu:
                 img = ImageOps.mirror(ImageOps.flip(img))
                 
             # Update the image
-            selected_img_data['image'] = img
-            self.editor.update_canvas()
+            self.editor.set_layer_image(selected_img_data, img, (flip_edit, {'direction': direction}))
+            self.editor.request_redraw()
             self.editor.update_status(f"Selected image flipped {direction}")
             
         except Exception as e:
@@ -560,7 +562,7 @@ class RotateMenu:
             for img_data in self.editor.images:
                 img_data['rotation'] = (img_data['rotation'] + angle) % 360
                 
-            self.editor.update_canvas()
+            self.editor.request_redraw()
             self.editor.update_status(f"Applied {angle}° rotation to all images")
             
             # Clear entry and reset slider
@@ -0,0 +1,116 @@
+class SpatialGrid:
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> set of keys overlapping that cell
+        self.bounds = {}  # key -> (x1, y1, x2, y2)
+        self.key_cells = {}  # key -> list of cells the key is registered in
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, key):
+        return key in self.bounds
+
+    def cell_range(self, x1, y1, x2, y2):
+        """Return the cells covered by a rectangle"""
+        size = self.cell_size
+        cells = []
+        for cell_x in range(int(x1 // size), int(x2 // size) + 1):
+            for cell_y in range(int(y1 // size), int(y2 // size) + 1):
+                cells.append((cell_x, cell_y))
+        return cells
+
+    def update(self, key, x1, y1, x2, y2):
+        """Insert key or move it to new bounds"""
+        new_bounds = (x1, y1, x2, y2)
+        if self.bounds.get(key) == new_bounds:
+            return
+        self.remove(key)
+        cells = self.cell_range(x1, y1, x2, y2)
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(key)
+        self.bounds[key] = new_bounds
+        self.key_cells[key] = cells
+
+    def remove(self, key):
+        """Remove key from the grid if present"""
+        if key not in self.bounds:
+            return
+        for cell in self.key_cells.pop(key):
+            members = self.cells[cell]
+            members.discard(key)
+            if not members:
+                del self.cells[cell]
+        del self.bounds[key]
+
+    def clear(self):
+        """Remove all keys"""
+        self.cells.clear()
+        self.bounds.clear()
+        self.key_cells.clear()
+
+    def query_point(self, x, y):
+        """Return keys whose bounds contain the point (edges inclusive)"""
+        size = self.cell_size
+        hits = []
+        for key in self.cells.get((int(x // size), int(y // size)), ()):
+            x1, y1, x2, y2 = self.bounds[key]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                hits.append(key)
+        return hits
+
+    def query_rect(self, x1, y1, x2, y2):
+        """Return keys whose bounds intersect the rectangle"""
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+        found = set()
+        for cell in self.cell_range(x1, y1, x2, y2):
+            found.update(self.cells.get(cell, ()))
+        hits = []
+        for key in found:
+            bx1, by1, bx2, by2 = self.bounds[key]
+            if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2:
+                hits.append(key)
+        return hits
+
+
+class AlphaHitMask:
+    def __init__(self, img, step=2, threshold=0):
+        """Pack the alpha channel of img into a 1-bit mask sampled every step pixels"""
+        self.width, self.height = img.size
+        self.step = step
+        self.bits = None  # None means the image is fully opaque
+        
+        if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+            import numpy as np  # Only needed once pixel-accurate picking is switched on
+            alpha = np.asarray(img.convert("RGBA").getchannel("A"))
+            # Pad to whole blocks and keep a block if any of its pixels is opaque enough
+            rows = -(-self.height // step)
+            cols = -(-self.width // step)
+            padded = np.zeros((rows * step, cols * step), dtype=alpha.dtype)
+            padded[:self.height, :self.width] = alpha
+            blocks = padded.reshape(rows, step, cols, step).max(axis=(1, 3))
+            self.bits = np.packbits(blocks > threshold, axis=1)
+
+    @property
+    def nbytes(self):
+        return 0 if self.bits is None else self.bits.nbytes
+
+    def hit(self, x, y):
+        """Return True if the local pixel (x, y) is opaque"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if self.bits is None:
+            return True
+        col = int(x) // self.step
+        row = int(y) // self.step
+        return bool((self.bits[row, col >> 3] >> (7 - (col & 7))) & 1)
+
+
+def is_opaque(img):
+    """Return True if every pixel of img is fully opaque"""
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        return img.convert("RGBA").getchannel("A").getextrema()[0] == 255
+    return True
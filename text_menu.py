@@ -407,7 +407,7 @@ class TextMenu:
         
         # Add underline if needed
         if text_element['underline']:
-            # Get text bounding box
+            # Get text bounding box (still in document coordinates)
             bbox = self.editor.canvas.bbox(text_id)
             if bbox:
                 x1, y1, x2, y2 = bbox
@@ -418,6 +418,10 @@ class TextMenu:
                     tags="text"
                 )
                 text_element['underline_id'] = underline_id
+                self.editor.place_overlay(underline_id)
+        
+        # Move to the current zoom and pan of the view
+        self.editor.place_overlay(text_id)
                 
     def redraw_all_text(self):
         """Redraw all text elements on the canvas"""
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from debug_log import get_logger
+
+logger = get_logger(__name__)
+
+
+def default_cache_dir():
+    """Return the per-user thumbnail cache directory"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "graphics_editor", "thumbnails")
+
+
+class ThumbnailCache:
+    def __init__(self, directory=None, max_bytes=512 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()  # get/put are called from import worker threads
+        self.entries = None  # file name -> (last use, size in bytes), scanned on first use
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        
+    def cache_key(self, image_path, max_size):
+        """Return the cache file name for a source file at its current mtime and size"""
+        stat = os.stat(image_path)
+        ident = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{max_size[0]}x{max_size[1]}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest() + ".png"
+        
+    def scan(self):
+        """Build the in-memory index of cached files (caller holds the lock)"""
+        if self.entries is not None:
+            return
+        self.entries = {}
+        self.total_bytes = 0
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    self.entries[entry.name] = (stat.st_mtime, stat.st_size)
+                    self.total_bytes += stat.st_size
+        except OSError as e:
+            logger.debug("Thumbnail cache disabled, cannot use %s: %s", self.directory, e)
+            self.enabled = False
+            
+    def get(self, image_path, max_size):
+        """Return (proxy image, full source size) from the cache, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            key = self.cache_key(image_path, max_size)
+        except OSError:
+            return None
+        path = os.path.join(self.directory, key)
+        
+        with self.lock:
+            self.scan()
+            if key not in self.entries:
+                self.misses += 1
+                return None
+        
+        try:
+            img = Image.open(path)
+            img.load()
+            width, height = img.text["source_size"].split("x")
+            full_size = (int(width), int(height))
+            os.utime(path)  # Last use for LRU eviction
+        except (OSError, KeyError, ValueError) as e:
+            logger.debug("Dropping unreadable thumbnail %s: %s", path, e)
+            self.remove(key)
+            with self.lock:
+                self.misses += 1
+            return None
+        
+        with self.lock:
+            self.hits += 1
+            if key in self.entries:
+                self.entries[key] = (os.path.getmtime(path), self.entries[key][1])
+        return img, full_size
+        
+    def put(self, image_path, max_size, img, full_size):
+        """Store a proxy for the source file and evict least recently used thumbnails over budget"""
+        if not self.enabled:
+            return
+        try:
+            key = self.cache_key(image_path, max_size)
+        except OSError:
+            return
+        path = os.path.join(self.directory, key)
+        # Write to a temp name first so readers never see a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        info = PngInfo()
+        info.add_text("source_size", f"{full_size[0]}x{full_size[1]}")
+        try:
+            img.save(temp_path, format="PNG", pnginfo=info, compress_level=1)
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except (OSError, ValueError) as e:
+            # Modes PNG can't store (CMYK, F) are simply not cached
+            logger.debug("Could not cache thumbnail of %s: %s", image_path, e)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        
+        with self.lock:
+            self.scan()
+            if key in self.entries:
+                self.total_bytes -= self.entries[key][1]
+            self.entries[key] = (os.path.getmtime(path), size)
+            self.total_bytes += size
+            self.evict()
+            
+    def evict(self):
+        """Delete least recently used thumbnails until under budget (caller holds the lock)"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self.entries.items(), key=lambda item: item[1][0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, key))
+            except OSError:
+                pass
+            del self.entries[key]
+            self.total_bytes -= size
+            
+    def remove(self, key):
+        """Delete one cached thumbnail"""
+        with self.lock:
+            entry = self.entries.pop(key, None) if self.entries is not None else None
+            if entry is not None:
+                self.total_bytes -= entry[1]
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except OSError:
+            pass
+            
+    def stats(self):
+        """Return hit/miss counters and disk use"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries or ()),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Shared by every proxy load
+thumbnail_cache = ThumbnailCache()
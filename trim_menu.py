@@ -1,8 +1,10 @@
 import customtkinter as ctk
 import tkinter as tk
-from PIL import Image, ImageTk
+from PIL import Image
 import math
 
+from proxy_pipeline import crop_edit, resize_edit
+
 class TrimMenu:
     def __init__(self, editor):
         self.editor = editor
@@ -365,6 +367,7 @@ class TrimMenu:
             dash=(5, 5),
             tags="crop"
         )
+        self.editor.place_overlay(self.crop_rectangle)
         
         # Update coordinates display
         self.coords_display.configure(text=f"({x1}, {y1}) to ({x2}, {y2})")
@@ -383,7 +386,9 @@ class TrimMenu:
         """Stop crop selection"""
         self.is_cropping = False
         if self.crop_rectangle:
-            x1, y1, x2, y2 = self.editor.canvas.coords(self.crop_rectangle)
+            # Selection in document coordinates (the rectangle itself is in view coordinates)
+            x1, y1 = min(self.crop_start[0], self.crop_end[0]), min(self.crop_start[1], self.crop_end[1])
+            x2, y2 = max(self.crop_start[0], self.crop_end[0]), max(self.crop_start[1], self.crop_end[1])
             img_data = self.editor.images[self.editor.selected_image_index]
             img_x, img_y = img_data['position']
             crop_x1 = int(x1 - img_x)
@@ -417,31 +422,30 @@ class TrimMenu:
         if not self.editor.images or self.editor.selected_image_index < 0:
             return
 
-        self.editor.save_state()
-        img_data = self.editor.images[self.editor.selected_image_index]
-        img = img_data['image']
+        with self.editor.transaction("Crop image"):
+            img_data = self.editor.images[self.editor.selected_image_index]
+            img = img_data['image']
 
-        # Upewnij się, że współrzędne są w zakresie obrazu
-        x1 = max(0, min(x1, img.width))
-        x2 = max(0, min(x2, img.width))
-        y1 = max(0, min(y1, img.height))
-        y2 = max(0, min(y2, img.height))
+            # Upewnij się, że współrzędne są w zakresie obrazu
+            x1 = max(0, min(x1, img.width))
+            x2 = max(0, min(x2, img.width))
+            y1 = max(0, min(y1, img.height))
+            y2 = max(0, min(y2, img.height))
 
-        if x2 <= x1 or y2 <= y1:
-            self.editor.update_status("Invalid crop area")
-            return
+            if x2 <= x1 or y2 <= y1:
+                self.editor.update_status("Invalid crop area")
+                return
 
-        cropped = img.crop((x1, y1, x2, y2))
-        img_data['image'] = cropped
-        img_data['width'], img_data['height'] = cropped.width, cropped.height
-        img_data['photo'] = ImageTk.PhotoImage(cropped)
-        # Przesuń obraz na środek
-        x = (self.editor.canvas_width - cropped.width) // 2
-        y = (self.editor.canvas_height - cropped.height) // 2
-        img_data['position'] = (x, y)
+            cropped = img.crop((x1, y1, x2, y2))
+            self.editor.set_layer_image(img_data, cropped, (crop_edit, {'box': (x1, y1, x2, y2)}))
+            img_data['width'], img_data['height'] = cropped.width, cropped.height
+            # Przesuń obraz na środek
+            x = (self.editor.canvas_width - cropped.width) // 2
+            y = (self.editor.canvas_height - cropped.height) // 2
+            img_data['position'] = (x, y)
 
-        self.editor.update_canvas()
-        self.editor.update_status("Image cropped")
+            self.editor.request_redraw()
+            self.editor.update_status("Image cropped")
         
     def resize_image(self):
         """Resize image by width and height"""
@@ -469,10 +473,10 @@ class TrimMenu:
             resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
             # Update the image
-            current_img_data['image'] = resized_img
+            self.editor.set_layer_image(current_img_data, resized_img, (resize_edit, {'size': resized_img.size}))
             
             # Update canvas
-            self.editor.update_canvas()
+            self.editor.request_redraw()
             
             self.editor.update_status(f"Image resized to {new_width}x{new_height}")
             
@@ -516,16 +520,15 @@ class TrimMenu:
 
             # Scale from original image
             resized_img = original_img.resize((new_width, new_height), Image.LANCZOS)
-            img_data['image'] = resized_img
+            self.editor.set_layer_image(img_data, resized_img, (resize_edit, {'size': resized_img.size}), from_original=True)
             img_data['width'], img_data['height'] = resized_img.width, resized_img.height
-            img_data['photo'] = ImageTk.PhotoImage(resized_img)
             
             # Center the image
             x = (self.editor.canvas_width - resized_img.width) // 2
             y = (self.editor.canvas_height - resized_img.height) // 2
             img_data['position'] = (x, y)
 
-            self.editor.update_canvas()
+            self.editor.request_redraw()
             self.editor.update_status(f"Scale: {percentage}% ({new_width}x{new_height})")
 
         except Exception as e:
@@ -564,7 +567,7 @@ class TrimMenu:
         current_img_data['position'] = (new_x, new_y)
         
         # Update canvas
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         
         self.editor.update_status(f"Image moved to ({new_x}, {new_y})")
         
@@ -585,7 +588,7 @@ class TrimMenu:
         current_img_data['position'] = (center_x, center_y)
         
         # Update canvas
-        self.editor.update_canvas()
+        self.editor.request_redraw()
         
         # Update position entries
         self.x_pos_entry.delete(0, tk.END)
@@ -620,41 +623,40 @@ class TrimMenu:
         if not new_width and not new_height and percentage == 100:
             return
             
-        self.editor.save_state()
-        
-        try:
-            for img_data in self.editor.images:
-                img = img_data['image'].copy()
-                
-                # Apply percentage resize if specified
-                if percentage != 100:
-                    new_w = int(img.width * percentage / 100)
-                    new_h = int(img.height * percentage / 100)
-                    img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        with self.editor.transaction("Resize all images"):
+            try:
+                for img_data in self.editor.images:
+                    img = img_data['image'].copy()
                     
-                # Apply specific dimensions if specified
-                if new_width and new_height:
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                elif new_width:
-                    # Maintain aspect ratio
-                    ratio = new_width / img.width
-                    new_h = int(img.height * ratio)
-                    img = img.resize((new_width, new_h), Image.Resampling.LANCZOS)
-                elif new_height:
-                    # Maintain aspect ratio
-                    ratio = new_height / img.height
-                    new_w = int(img.width * ratio)
-                    img = img.resize((new_w, new_height), Image.Resampling.LANCZOS)
+                    # Apply percentage resize if specified
+                    if percentage != 100:
+                        new_w = int(img.width * percentage / 100)
+                        new_h = int(img.height * percentage / 100)
+                        img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+                        
+                    # Apply specific dimensions if specified
+                    if new_width and new_height:
+                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                    elif new_width:
+                        # Maintain aspect ratio
+                        ratio = new_width / img.width
+                        new_h = int(img.height * ratio)
+                        img = img.resize((new_width, new_h), Image.Resampling.LANCZOS)
+                    elif new_height:
+                        # Maintain aspect ratio
+                        ratio = new_height / img.height
+                        new_w = int(img.width * ratio)
+                        img = img.resize((new_w, new_height), Image.Resampling.LANCZOS)
+                        
+                    self.editor.set_layer_image(img_data, img, (resize_edit, {'size': img.size}))
                     
-                img_data['image'] = img
+                # Update canvas
+                self.editor.request_redraw()
                 
-            # Update canvas
-            self.editor.update_canvas()
-            
-            self.editor.update_status("Applied resize to all images")
-            
-        except Exception as e:
-            self.editor.update_status(f"Error resizing all images: {str(e)}")
+                self.editor.update_status("Applied resize to all images")
+                
+            except Exception as e:
+                self.editor.update_status(f"Error resizing all images: {str(e)}")
             
     def update_apply_buttons(self):
         """Update button states"""